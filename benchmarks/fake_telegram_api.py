@@ -0,0 +1,105 @@
+import asyncio
+import json
+from collections import Counter
+from time import time
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+
+BOT_USER = {
+    "id": 42,
+    "is_bot": True,
+    "first_name": "Benchmark",
+    "username": "benchmark_bot",
+}
+
+# Methods that return the sent or edited message
+MESSAGE_METHODS = {"sendMessage", "forwardMessage", "editMessageText"}
+
+
+class FakeTelegramAPI:
+    """
+    Local Bot API server that accepts every request, answers it after a fixed
+    latency with a minimal valid result and counts the calls by method.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        on_message: Optional[Callable[[str, dict[str, Any]], None]] = None,
+    ) -> None:
+        self.latency = latency
+        # Called with the method and the message of every sent or edited message
+        self.on_message = on_message
+        self.calls: Counter[str] = Counter()
+        self._last_message_ids: Counter[int] = Counter()
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+
+        data = dict(await request.post())
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return web.json_response({"ok": True, "result": self.get_result(method, data)})
+
+    def get_result(self, method: str, data: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+
+        if method == "copyMessage":
+            return {"message_id": self.next_message_id(int(data["chat_id"]))}
+
+        if method not in MESSAGE_METHODS:
+            return True
+
+        chat_id = int(data["chat_id"])
+        if method == "editMessageText":
+            message_id = int(data["message_id"])
+        else:
+            message_id = self.next_message_id(chat_id)
+
+        message = {
+            "message_id": message_id,
+            "date": int(time()),
+            "chat": {
+                "id": chat_id,
+                "type": "private" if chat_id > 0 else "supergroup",
+            },
+            "from": BOT_USER,
+            "text": data.get("text", ""),
+        }
+
+        if data.get("message_thread_id"):
+            message["message_thread_id"] = int(data["message_thread_id"])
+            message["is_topic_message"] = True
+
+        if data.get("reply_markup"):
+            message["reply_markup"] = json.loads(data["reply_markup"])
+
+        if self.on_message is not None:
+            self.on_message(method, message)
+
+        return message
+
+    def next_message_id(self, chat_id: int) -> int:
+        self._last_message_ids[chat_id] += 1
+        return self._last_message_ids[chat_id]
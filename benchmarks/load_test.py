@@ -0,0 +1,356 @@
+"""
+Load generator that simulates residents filing requests, polling /status
+and admins changing statuses, stepping the arrival rate up to find where
+the deployment saturates.
+
+The load test serves a stub Bot API on --api-port and waits until the instance
+under test, pointed at the stub, answers on --url:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rates 20,50,100,200
+    TELEGRAM_API_URL=http://127.0.0.1:8081 ADMIN_API_TOKEN=load \\
+        MONGO_DB_NAME=studmisto_load WEBHOOK_SECRET=load python main.py
+
+Every step reports webhook acknowledgement latency, rejected updates,
+processed updates per second, event loop lag and Mongo commands by name,
+scraped from /metrics and /admin/mongo of the instance.
+"""
+
+import argparse
+import asyncio
+import random
+from time import perf_counter, time
+from typing import Any, Optional
+
+from benchmarks.fake_telegram_api import FakeTelegramAPI
+from benchmarks.prometheus import (
+    Samples,
+    histogram_quantile,
+    parse_metrics,
+    sum_samples,
+)
+from benchmarks.stats import format_row, percentile
+from benchmarks.updates import Update, UpdateFactory
+from constants.dorms import DORMS
+from constants.order_types import OrderType
+
+FIRST_USER_ID = 200_000
+ADMIN_IDS = [1001, 1002, 1003]
+
+# A step saturates the instance if any of these is exceeded
+MAX_REJECTED_SHARE = 0.01
+MIN_PROCESSED_SHARE = 0.9
+
+
+class AdminCards:
+    """
+    Request cards the instance posted to the admin chat, taken from the stub Bot API,
+    so admins can click their status buttons without access to Mongo.
+    """
+
+    def __init__(self, admin_chat_id: int) -> None:
+        self.admin_chat_id = admin_chat_id
+        self.cards: dict[int, list[str]] = {}
+
+    def on_message(self, _: str, message: dict[str, Any]) -> None:
+        if message["chat"]["id"] != self.admin_chat_id:
+            return
+
+        keyboard = message.get("reply_markup", {}).get("inline_keyboard", [])
+        callbacks = [
+            button["callback_data"]
+            for row in keyboard
+            for button in row
+            if button.get("callback_data", "").startswith("status:")
+        ]
+
+        if callbacks:
+            self.cards[message["message_id"]] = callbacks
+        else:
+            self.cards.pop(message["message_id"], None)
+
+    def pick(self) -> Optional[tuple[int, str]]:
+        if not self.cards:
+            return None
+
+        message_id = random.choice(list(self.cards))
+        return message_id, random.choice(self.cards[message_id])
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, client: Any) -> None:
+        self.args = args
+        self.client = client
+        self.factory = UpdateFactory(args.admin_chat_id, int(time() * 1000))
+        self.admin_cards = AdminCards(args.admin_chat_id)
+        self.order_types = list(OrderType)
+
+        self._next_user_id = FIRST_USER_ID
+        self._latencies: list[float] = []
+        self._statuses: dict[int, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def post(self, update: Update) -> None:
+        start = perf_counter()
+
+        try:
+            response = await self.client.post(
+                "/",
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": self.args.webhook_secret},
+            )
+            status_code = response.status_code
+        except Exception:
+            status_code = 0
+
+        self._latencies.append(perf_counter() - start)
+        self._statuses[status_code] = self._statuses.get(status_code, 0) + 1
+
+    async def resident(self) -> None:
+        user_id = self._next_user_id
+        self._next_user_id += 1
+
+        updates = self.factory.request_form(
+            user_id,
+            random.choice(DORMS),
+            random.choice(self.order_types).name,
+        )
+        for update in updates:
+            await self.post(update)
+            await asyncio.sleep(random.expovariate(1 / self.args.think_time))
+
+    async def status_poll(self) -> None:
+        user_id = random.randint(FIRST_USER_ID, max(FIRST_USER_ID, self._next_user_id))
+        await self.post(self.factory.status_command(user_id))
+
+    async def admin(self) -> None:
+        card = self.admin_cards.pick()
+        if card is None:
+            return
+
+        message_id, callback_data = card
+        await self.post(
+            self.factory.callback(
+                random.choice(ADMIN_IDS),
+                callback_data,
+                message_id,
+                chat_id=self.args.admin_chat_id,
+            )
+        )
+
+    async def run_step(self, rate: float) -> dict[str, Any]:
+        self._latencies = []
+        self._statuses = {}
+
+        metrics_before = await self.scrape_metrics()
+        mongo_before = await self.scrape_mongo()
+
+        sessions = [self.resident, self.status_poll, self.admin]
+        weights = [self.args.residents, self.args.status_polls, self.args.admins]
+
+        start = perf_counter()
+        while perf_counter() - start < self.args.step_duration:
+            session = random.choices(sessions, weights)[0]
+            task = asyncio.create_task(session())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            await asyncio.sleep(random.expovariate(rate))
+
+        # Residents still in the middle of the form keep sending into the next step,
+        # give the instance a moment to catch up before the scrape. Sent and processed
+        # updates are both counted over the whole window, settling included
+        await asyncio.sleep(self.args.settle_time)
+
+        duration = perf_counter() - start
+        metrics_after = await self.scrape_metrics()
+        mongo_after = await self.scrape_mongo()
+
+        sent = len(self._latencies)
+        accepted = self._statuses.get(200, 0)
+        processed = sum_samples(metrics_after, "bot_updates_total") - sum_samples(
+            metrics_before, "bot_updates_total"
+        )
+        latencies = sorted(self._latencies)
+
+        return {
+            "rate": rate,
+            "sent_per_second": sent / duration,
+            "processed_per_second": processed / duration,
+            "rejected": self._statuses.get(503, 0),
+            "errors": sent - accepted - self._statuses.get(503, 0),
+            "sent": sent,
+            "accepted": accepted,
+            "processed": processed,
+            "ack_p50": percentile(latencies, 0.5),
+            "ack_p99": percentile(latencies, 0.99),
+            "queued": sum_samples(metrics_after, "bot_updates_queued"),
+            "loop_lag_p99": histogram_quantile(
+                metrics_before, metrics_after, "bot_event_loop_lag_seconds", 0.99
+            ),
+            "mongo": {
+                command: count - mongo_before.get(command, 0)
+                for command, count in mongo_after.items()
+                if count - mongo_before.get(command, 0)
+            },
+        }
+
+    async def scrape_metrics(self) -> Samples:
+        response = await self.client.get("/metrics")
+        return parse_metrics(response.text)
+
+    async def scrape_mongo(self) -> dict[str, int]:
+        if not self.args.admin_token:
+            return {}
+
+        response = await self.client.get(
+            "/admin/mongo", headers={"X-Admin-Token": self.args.admin_token}
+        )
+        if response.status_code != 200:
+            return {}
+
+        counts: dict[str, int] = {}
+        for stats in response.json()["commands"]:
+            counts[stats["command"]] = counts.get(stats["command"], 0) + stats["count"]
+
+        return counts
+
+
+def is_saturated(step: dict[str, Any], max_ack_p99: float) -> bool:
+    return (
+        step["rejected"] > MAX_REJECTED_SHARE * step["sent"]
+        or step["processed"] < MIN_PROCESSED_SHARE * step["accepted"]
+        or step["ack_p99"] > max_ack_p99
+    )
+
+
+def print_step(step: dict[str, Any]) -> None:
+    loop_lag = step["loop_lag_p99"]
+
+    print(
+        format_row(
+            (
+                f"{step['rate']:g}/s",
+                f"{step['sent_per_second']:.1f}",
+                f"{step['processed_per_second']:.1f}",
+                step["rejected"],
+                step["errors"],
+                f"{step['ack_p50'] * 1000:.1f}",
+                f"{step['ack_p99'] * 1000:.1f}",
+                f"{step['queued']:g}",
+                f"≤{loop_lag * 1000:g}" if loop_lag is not None else "-",
+            ),
+            STEP_WIDTHS,
+        )
+    )
+
+    if step["mongo"]:
+        mongo = ", ".join(
+            f"{command} {count / (step['sent'] or 1):.2f}"
+            for command, count in sorted(step["mongo"].items())
+        )
+        print(f"    Mongo commands per update: {mongo}")
+
+
+STEP_COLUMNS = (
+    "arrivals",
+    "sent/s",
+    "done/s",
+    "503",
+    "errors",
+    "ack p50 ms",
+    "ack p99 ms",
+    "queued",
+    "lag p99 ms",
+)
+STEP_WIDTHS = (9, 8, 8, 6, 6, 10, 10, 7, 10)
+
+
+async def wait_for_instance(client: Any, interval: float = 1) -> None:
+    while True:
+        try:
+            response = await client.get("/metrics")
+            if response.status_code == 200:
+                return
+        except Exception:
+            pass
+
+        await asyncio.sleep(interval)
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+
+    load_test: Optional[LoadTest] = None
+
+    def on_message(method: str, message: dict[str, Any]) -> None:
+        if load_test is not None:
+            load_test.admin_cards.on_message(method, message)
+
+    fake_api = FakeTelegramAPI(latency=args.api_latency, on_message=on_message)
+    api_url = await fake_api.start(port=args.api_port)
+    print(f"Stub Bot API is listening on {api_url}")
+
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=args.timeout
+    ) as client:
+        print(f"Waiting for the instance on {args.url}")
+        await wait_for_instance(client)
+
+        load_test = LoadTest(args, client)
+
+        print(format_row(STEP_COLUMNS, STEP_WIDTHS))
+
+        saturation_rate = None
+        for rate in args.rates:
+            step = await load_test.run_step(rate)
+            print_step(step)
+
+            if is_saturated(step, args.max_ack_p99):
+                saturation_rate = rate
+                break
+
+    await fake_api.stop()
+
+    if saturation_rate is None:
+        print("\nThe instance kept up with every step")
+    else:
+        print(f"\nThe instance saturated at {saturation_rate:g} sessions per second")
+
+    api_calls = ", ".join(
+        f"{method} {calls}" for method, calls in fake_api.calls.most_common()
+    )
+    print(f"Bot API calls: {api_calls}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--rates",
+        type=lambda value: [float(rate) for rate in value.split(",")],
+        default=[10.0, 20.0, 50.0, 100.0, 200.0],
+        help="new sessions per second of every step",
+    )
+    parser.add_argument("--step-duration", type=float, default=30)
+    parser.add_argument("--settle-time", type=float, default=10)
+    parser.add_argument(
+        "--think-time", type=float, default=2, help="mean seconds between form steps"
+    )
+    parser.add_argument("--residents", type=float, default=6, help="session weight")
+    parser.add_argument("--status-polls", type=float, default=3, help="session weight")
+    parser.add_argument("--admins", type=float, default=1, help="session weight")
+    parser.add_argument("--max-ack-p99", type=float, default=0.5)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--admin-chat-id", type=int, default=-1001234567890)
+    parser.add_argument("--webhook-secret", default="load")
+    parser.add_argument("--admin-token", default="load")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
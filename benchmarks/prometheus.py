@@ -0,0 +1,67 @@
+import re
+from typing import Optional
+
+SAMPLE_RE = re.compile(
+    r"^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$"
+)
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Samples = dict[tuple[str, frozenset], float]
+
+
+def parse_metrics(text: str) -> Samples:
+    """
+    Parses samples of the Prometheus text exposition format.
+    """
+    samples: Samples = {}
+
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if match is None:
+            continue
+
+        labels = frozenset(LABEL_RE.findall(match["labels"] or ""))
+        samples[(match["name"], labels)] = float(match["value"])
+
+    return samples
+
+
+def sum_samples(samples: Samples, name: str, **labels: str) -> float:
+    return sum(
+        value
+        for (sample_name, sample_labels), value in samples.items()
+        if sample_name == name and set(labels.items()) <= sample_labels
+    )
+
+
+def histogram_quantile(
+    before: Samples, after: Samples, name: str, q: float
+) -> Optional[float]:
+    """
+    Estimates the quantile of the observations made between two scrapes
+    from the growth of the histogram buckets. Returns the bucket's upper bound.
+    """
+    buckets: dict[float, float] = {}
+
+    for (sample_name, labels), value in after.items():
+        if sample_name != f"{name}_bucket":
+            continue
+
+        upper = dict(labels)["le"]
+        upper_bound = float("inf") if upper == "+Inf" else float(upper)
+        buckets[upper_bound] = (
+            buckets.get(upper_bound, 0) + value - before.get((sample_name, labels), 0)
+        )
+
+    if not buckets:
+        return None
+
+    total = buckets[max(buckets)]
+    if total <= 0:
+        return None
+
+    for upper_bound in sorted(buckets):
+        if buckets[upper_bound] >= q * total:
+            return upper_bound
+
+    return None
@@ -0,0 +1,19 @@
+from typing import Iterable
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a sorted list.
+    """
+    if not values:
+        return 0.0
+
+    rank = max(1, round(q * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def format_row(columns: Iterable[object], widths: Iterable[int]) -> str:
+    return "  ".join(
+        str(column).ljust(width) if i == 0 else str(column).rjust(width)
+        for i, (column, width) in enumerate(zip(columns, widths))
+    )
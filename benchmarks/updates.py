@@ -0,0 +1,146 @@
+from itertools import count
+from time import time
+from typing import Any, Optional
+
+from benchmarks.fake_telegram_api import BOT_USER
+
+# Far above the ids the fake Bot API gives to bot messages, so they never collide
+FIRST_USER_MESSAGE_ID = 1_000_000
+
+Update = dict[str, Any]
+
+
+class UpdateFactory:
+    """
+    Builds raw webhook updates the way Telegram sends them.
+    """
+
+    def __init__(self, admin_chat_id: int, first_update_id: int = 1) -> None:
+        self.admin_chat_id = admin_chat_id
+        # Must grow between runs against one instance, which drops repeated update ids
+        self._update_ids = count(first_update_id)
+        self._message_ids = count(FIRST_USER_MESSAGE_ID)
+
+    @staticmethod
+    def get_user(user_id: int) -> dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"Resident{user_id}",
+            "username": f"resident{user_id}",
+        }
+
+    @staticmethod
+    def get_chat(chat_id: int) -> dict[str, Any]:
+        return {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"}
+
+    def message(
+        self,
+        user_id: int,
+        text: str,
+        chat_id: Optional[int] = None,
+        reply_to_message: Optional[dict[str, Any]] = None,
+    ) -> Update:
+        message: dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time()),
+            "chat": self.get_chat(chat_id if chat_id is not None else user_id),
+            "from": self.get_user(user_id),
+            "text": text,
+        }
+
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(command)}
+            ]
+
+        if reply_to_message is not None:
+            message["reply_to_message"] = reply_to_message
+
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(
+        self, user_id: int, data: str, message_id: int, chat_id: Optional[int] = None
+    ) -> Update:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self.get_user(user_id),
+                "chat_instance": str(chat_id if chat_id is not None else user_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time()),
+                    "chat": self.get_chat(chat_id if chat_id is not None else user_id),
+                    "from": BOT_USER,
+                    "text": "",
+                },
+            },
+        }
+
+    @staticmethod
+    def bot_message(chat_id: int, message_id: int, text: str = "") -> dict[str, Any]:
+        return {
+            "message_id": message_id,
+            "date": int(time()),
+            "chat": UpdateFactory.get_chat(chat_id),
+            "from": BOT_USER,
+            "text": text,
+        }
+
+    def request_form(self, user_id: int, dorm: int, problem_type: str) -> list[Update]:
+        """
+        Updates of a resident filling in the whole RequestForm.
+        """
+        return [
+            self.message(user_id, "/request"),
+            self.message(user_id, f"Мешканець {user_id}"),
+            self.message(user_id, "+380991234567"),
+            self.callback(user_id, f"dorm:{dorm}", 1),
+            self.callback(user_id, f"ptype:{problem_type}", 1),
+            self.message(user_id, f"Кімната {user_id % 500}, не працює розетка"),
+        ]
+
+    def status_click(
+        self,
+        admin_id: int,
+        request_id: str,
+        status: str,
+        admin_message_id: int,
+        current_status: str = "WAITING",
+    ) -> Update:
+        return self.callback(
+            admin_id,
+            f"status:{status}:{current_status}:{request_id}",
+            admin_message_id,
+            chat_id=self.admin_chat_id,
+        )
+
+    def status_command(self, user_id: int) -> Update:
+        return self.message(user_id, "/status")
+
+    def cancel(self, user_id: int, digits_id: str, user_message_id: int) -> Update:
+        return self.message(
+            user_id,
+            "/cancel",
+            reply_to_message=self.bot_message(
+                user_id, user_message_id, f"Заявка #{digits_id} відправлена."
+            ),
+        )
+
+    def user_reply(self, user_id: int, user_message_id: int) -> Update:
+        return self.message(
+            user_id,
+            "Додаткова інформація до заявки",
+            reply_to_message=self.bot_message(user_id, user_message_id),
+        )
+
+    def admin_reply(self, admin_id: int, admin_message_id: int) -> Update:
+        return self.message(
+            admin_id,
+            "Відповідь адміністратора",
+            chat_id=self.admin_chat_id,
+            reply_to_message=self.bot_message(self.admin_chat_id, admin_message_id),
+        )
@@ -0,0 +1,320 @@
+"""
+Benchmark of the webhook hot path.
+
+Starts the app in-process with its lifespan, replays synthetic updates through
+an ASGI client and reports the webhook acknowledgement latency per phase
+and p50/p95/p99 of every handler. The Bot API is served by a local fake server
+and Mongo by a separate database (dropped afterwards) on a local server:
+
+    docker run -d -p 27017:27017 mongo
+    python -m benchmarks.webhook_benchmark --users 200
+
+Needs httpx (pip install -r benchmarks/requirements.txt).
+Google Sheets writes are replaced with no-ops, they are not part of the hot path.
+"""
+
+import argparse
+import asyncio
+import os
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from benchmarks.fake_telegram_api import FakeTelegramAPI
+from benchmarks.stats import format_row, percentile
+from benchmarks.updates import Update, UpdateFactory
+
+ADMIN_CHAT_ID = -1001000000000
+ADMIN_ID = 1000
+FIRST_USER_ID = 100_000
+WEBHOOK_SECRET = "benchmark"
+
+
+def configure_environment(args: argparse.Namespace, api_url: str) -> None:
+    """
+    Must run before the app is imported, config.py reads the environment on import.
+    """
+    os.environ.update(
+        {
+            "BOT_TOKEN": "42:benchmark",
+            "TELEGRAM_API_URL": api_url,
+            "WEBHOOK_URL": "http://benchmark/",
+            "WEBHOOK_SECRET": WEBHOOK_SECRET,
+            "ADMIN_CHAT_ID": str(ADMIN_CHAT_ID),
+            "MONGO_URI": args.mongo_uri,
+            "MONGO_DB_NAME": args.mongo_db,
+            "TELEGRAM_GLOBAL_RATE": "100000",
+            "TELEGRAM_CHAT_RATE": "100000",
+            "TELEGRAM_GROUP_RATE": "100000",
+        }
+    )
+
+
+def disable_sheets() -> None:
+    from google_sheets_service import SheetsWriteBatch
+
+    SheetsWriteBatch.write_appends = lambda self: ({}, {})
+    SheetsWriteBatch.write_status_updates = lambda self, known_rows: ({}, {})
+
+
+class WebhookBenchmark:
+    def __init__(self, client: Any, concurrency: int) -> None:
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.results: list[dict[str, Any]] = []
+
+    async def post(self, updates: list[Update], latencies: list[float]) -> None:
+        """
+        Posts the updates of one chat one after another, so they keep their order.
+        """
+        async with self.semaphore:
+            for update in updates:
+                start = perf_counter()
+                response = await self.client.post(
+                    "/",
+                    json=update,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET},
+                )
+                latencies.append(perf_counter() - start)
+
+                if response.status_code != 200:
+                    print(
+                        f"Update {update['update_id']} answered {response.status_code}"
+                    )
+
+    async def run_phase(
+        self,
+        name: str,
+        chats: list[list[Update]],
+        wait: Callable[[], Awaitable[None]],
+    ) -> None:
+        """
+        Posts the updates of all chats concurrently and waits until they are processed.
+        """
+        latencies: list[float] = []
+        start = perf_counter()
+
+        await asyncio.gather(*(self.post(updates, latencies) for updates in chats))
+        await wait()
+
+        updates_count = len(latencies)
+
+        duration = perf_counter() - start
+        latencies.sort()
+
+        self.results.append(
+            {
+                "phase": name,
+                "updates": updates_count,
+                "updates_per_second": updates_count / duration if duration else 0.0,
+                "p50": percentile(latencies, 0.5),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+            }
+        )
+
+
+async def wait_for_updates() -> None:
+    from update_worker_pool import update_worker_pool
+
+    while update_worker_pool.queued or update_worker_pool.in_flight:
+        await asyncio.sleep(0.01)
+
+
+async def wait_for_side_effects() -> None:
+    """
+    Waits for the updates and for the outbox jobs they created.
+    """
+    from constants.outbox_job_statuses import OutboxJobStatus
+    from database import db
+
+    await wait_for_updates()
+
+    while await db.requests.count_documents(
+        {"pending_jobs.key": {"$exists": True}}, limit=1
+    ) or await db.outbox.count_documents(
+        {"status": OutboxJobStatus.PENDING.value}, limit=1
+    ):
+        await asyncio.sleep(0.05)
+
+
+async def run(args: argparse.Namespace) -> None:
+    fake_api = FakeTelegramAPI(latency=args.api_latency)
+    api_url = await fake_api.start(port=args.api_port)
+
+    configure_environment(args, api_url)
+    disable_sheets()
+
+    import httpx
+
+    from bot_webhook import app
+    from constants.dorms import DORMS
+    from constants.order_types import OrderType
+    from database import db, db_client
+    from metrics import handler_duration
+
+    factory = UpdateFactory(ADMIN_CHAT_ID)
+    order_types = list(OrderType)
+    users = [FIRST_USER_ID + i for i in range(args.users)]
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark"
+            ) as client:
+                benchmark = WebhookBenchmark(client, args.concurrency)
+
+                await benchmark.run_phase(
+                    "request form",
+                    [
+                        factory.request_form(
+                            user_id,
+                            DORMS[i % len(DORMS)],
+                            order_types[i % len(order_types)].name,
+                        )
+                        for i, user_id in enumerate(users)
+                    ],
+                    wait_for_side_effects,
+                )
+
+                requests = await db.requests.find(
+                    {"user_id": {"$in": users}},
+                    {"user_id": 1, "digits_id": 1},
+                ).to_list(length=None)
+                mappings = {
+                    mapping["user_id"]: mapping
+                    async for mapping in db.feedback.find({"user_id": {"$in": users}})
+                }
+
+                # Even users' requests are taken into work, odd users cancel theirs
+                taken = [r for r in requests if r["user_id"] % 2 == 0]
+                cancelled = [r for r in requests if r["user_id"] % 2 == 1]
+
+                await benchmark.run_phase(
+                    "status clicks",
+                    [
+                        [
+                            factory.status_click(
+                                ADMIN_ID,
+                                str(request["_id"]),
+                                "IN_PROGRESS",
+                                mappings[request["user_id"]]["admin_message_id"],
+                            )
+                        ]
+                        for request in taken
+                        if request["user_id"] in mappings
+                    ],
+                    wait_for_side_effects,
+                )
+                await benchmark.run_phase(
+                    "/cancel",
+                    [
+                        [
+                            factory.cancel(
+                                request["user_id"],
+                                request["digits_id"],
+                                mappings[request["user_id"]]["user_message_id"],
+                            )
+                        ]
+                        for request in cancelled
+                        if request["user_id"] in mappings
+                    ],
+                    wait_for_side_effects,
+                )
+                await benchmark.run_phase(
+                    "/status",
+                    [[factory.status_command(user_id)] for user_id in users],
+                    wait_for_updates,
+                )
+                await benchmark.run_phase(
+                    "feedback relays",
+                    [
+                        [
+                            factory.user_reply(
+                                mapping["user_id"], mapping["user_message_id"]
+                            ),
+                            factory.admin_reply(ADMIN_ID, mapping["admin_message_id"]),
+                        ]
+                        for mapping in mappings.values()
+                    ],
+                    wait_for_updates,
+                )
+    finally:
+        if not args.keep_db:
+            await db_client.drop_database(args.mongo_db)
+
+        await fake_api.stop()
+
+    print_report(benchmark.results, handler_duration.summaries(), fake_api)
+
+
+def print_report(
+    phases: list[dict[str, Any]],
+    handlers: list[dict[str, Any]],
+    fake_api: FakeTelegramAPI,
+) -> None:
+    widths = (16, 8, 10, 10, 10, 10)
+
+    print("Webhook acknowledgement, ms")
+    print(format_row(("phase", "updates", "updates/s", "p50", "p95", "p99"), widths))
+    for phase in phases:
+        print(
+            format_row(
+                (
+                    phase["phase"],
+                    phase["updates"],
+                    f"{phase['updates_per_second']:.1f}",
+                    f"{phase['p50'] * 1000:.2f}",
+                    f"{phase['p95'] * 1000:.2f}",
+                    f"{phase['p99'] * 1000:.2f}",
+                ),
+                widths,
+            )
+        )
+
+    widths = (32, 8, 8, 10, 10, 10)
+
+    print("\nHandlers, ms (estimated from histogram buckets)")
+    print(format_row(("handler", "outcome", "count", "p50", "p95", "p99"), widths))
+    for summary in sorted(handlers, key=lambda s: (s["handler"], s["outcome"])):
+        print(
+            format_row(
+                (
+                    summary["handler"],
+                    summary["outcome"],
+                    summary["count"],
+                    f"{summary['p50'] * 1000:.2f}",
+                    f"{summary['p95'] * 1000:.2f}",
+                    f"{summary['p99'] * 1000:.2f}",
+                ),
+                widths,
+            )
+        )
+
+    print("\nBot API calls")
+    for method, calls in fake_api.calls.most_common():
+        print(f"{method}: {calls}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--api-latency",
+        type=float,
+        default=0.0,
+        help="seconds the fake Bot API waits before answering",
+    )
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-db", default="studmisto_benchmark")
+    parser.add_argument(
+        "--keep-db", action="store_true", help="don't drop the benchmark database"
+    )
+
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,60 @@
+import asyncio
+import hmac
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from aiogram import Bot, Dispatcher
-from aiogram.types import Update
-
-from config import BOT_TOKEN, WEBHOOK_SECRET, WEBHOOK_URL
-from database import db, setup_indexes
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from config import (
+    ADMIN_API_TOKEN,
+    BOT_TOKEN,
+    TELEGRAM_API_URL,
+    WEBHOOK_DEDUP_SIZE,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from database import (
+    backfill_request_digits_ids,
+    check_query_plans,
+    db,
+    db_client,
+    setup_indexes,
+)
+from feedback_archiver import feedback_archiver
+from feedback_cache import feedback_cache
+from feedback_write_buffer import feedback_write_buffer
 from handlers import register_handlers
-
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+from metrics import monitor_event_loop_lag, registry, updates_queued
+from middlewares.metrics import TelegramMetricsMiddleware, UpdateMetricsMiddleware
+from middlewares.rate_limit import RateLimitMiddleware
+from mongo_profiler import mongo_command_stats
+from mongo_fsm_storage import MongoFSMStorage
+from open_queues import open_queues
+from outbox import outbox
+from sheets_sync_worker import sheets_sync_worker
+from task_counters import task_counters
+from update_worker_pool import update_worker_pool
+from utils.lru_set import LRUSet
+
+if TELEGRAM_API_URL:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+else:
+    session = AiohttpSession()
+
+bot = Bot(token=BOT_TOKEN, session=session)
+bot.session.middleware(RateLimitMiddleware())
+bot.session.middleware(TelegramMetricsMiddleware())
+dp = Dispatcher(storage=MongoFSMStorage(db.fsm_states))
+dp.update.outer_middleware(UpdateMetricsMiddleware())
 register_handlers(dp, db)
 
+recent_update_ids = LRUSet(WEBHOOK_DEDUP_SIZE)
+
+registry.add_collector(lambda: updates_queued.set(update_worker_pool.queued))
+
 
 async def set_webhook():
     await bot.set_webhook(
@@ -24,21 +67,65 @@ async def set_webhook():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    setup_indexes(db)
+    event_loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+
+    await setup_indexes(db)
+    await check_query_plans(db)
+    await backfill_request_digits_ids(db)
+    await open_queues.load(db.requests)
+    open_queues.start_reconciliation(db.requests)
+    await task_counters.recount()
+    task_counters.start_recount()
+    sheets_sync_worker.start()
+    feedback_write_buffer.start()
+    feedback_archiver.start()
+    outbox.start(bot)
+    update_worker_pool.start(bot, dp)
 
     await set_webhook()
 
     yield
 
+    await update_worker_pool.stop()
+    await outbox.stop()
+    await feedback_write_buffer.stop()
+    await feedback_archiver.stop()
+    await sheets_sync_worker.stop()
+    await open_queues.stop_reconciliation()
+    await task_counters.stop_recount()
     await bot.session.close()
 
+    event_loop_lag_task.cancel()
+
 
 app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
 def health_check():
-    return {"ok": True}
+    return {
+        "ok": True,
+        "updates": update_worker_pool.stats(),
+        "feedback_cache": feedback_cache.stats(),
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/mongo")
+async def mongo_stats(request: Request):
+    admin_token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_API_TOKEN or not hmac.compare_digest(
+        admin_token.encode(), ADMIN_API_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    await mongo_command_stats.explain_slow_queries(db_client)
+
+    return mongo_command_stats.report()
 
 
 @app.get("/set_webhook")
@@ -48,15 +135,39 @@ async def set_webhook_handler():
     return {"ok": True}
 
 
+def is_valid_secret_token(request: Request) -> bool:
+    if not WEBHOOK_SECRET:
+        return True
+
+    secret_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+
+    return hmac.compare_digest(secret_token.encode(), WEBHOOK_SECRET.encode())
+
+
 @app.post("/")
 async def telegram_webhook(request: Request):
+    if not is_valid_secret_token(request):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+
     try:
         raw_update = await request.json()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    update = Update.model_validate(raw_update, context={"bot": bot})
+    if not isinstance(raw_update, dict):
+        raise HTTPException(status_code=400, detail="Update must be an object")
+
+    # Telegram redelivers updates it didn't get a timely answer for.
+    # Updates without an ID can't be told apart, so they are never dropped
+    update_id = raw_update.get("update_id")
+    is_deduplicated = isinstance(update_id, int)
+    if is_deduplicated and update_id in recent_update_ids:
+        return {"ok": True}
+
+    if not update_worker_pool.submit(raw_update):
+        raise HTTPException(status_code=503, detail="Update queue is full")
 
-    await dp.feed_update(bot, update)
+    if is_deduplicated:
+        recent_update_ids.add(update_id)
 
     return {"ok": True}
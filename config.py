@@ -4,19 +4,54 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = getenv("BOT_TOKEN")
+# Bot API server to use instead of api.telegram.org, e.g. a local fake for benchmarks
+TELEGRAM_API_URL = getenv("TELEGRAM_API_URL")
 
 WEBHOOK_URL = getenv("WEBHOOK_URL")
 WEBHOOK_SECRET = getenv("WEBHOOK_SECRET")
+WEBHOOK_WORKERS = int(getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_DRAIN_TIMEOUT = float(getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+WEBHOOK_DEDUP_SIZE = int(getenv("WEBHOOK_DEDUP_SIZE", "10000"))
+
+ADMIN_API_TOKEN = getenv("ADMIN_API_TOKEN")
+
+TELEGRAM_GLOBAL_RATE = float(getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE = float(getenv("TELEGRAM_GROUP_RATE", "20"))
+TELEGRAM_MAX_RETRIES = int(getenv("TELEGRAM_MAX_RETRIES", "3"))
 
 MONGO_URI = getenv("MONGO_URI")
+MONGO_DB_NAME = getenv("MONGO_DB_NAME", "studmisto")
+MONGO_SLOW_QUERY_MS = float(getenv("MONGO_SLOW_QUERY_MS", "100"))
+FSM_STATE_TTL = int(getenv("FSM_STATE_TTL", "86400"))
 ADMIN_CHAT_ID = int(getenv("ADMIN_CHAT_ID"))
 CHAT_THREAD_FEEDBACK = int(getenv("CHAT_THREAD_FEEDBACK") or "0")
+FEEDBACK_CACHE_SIZE = int(getenv("FEEDBACK_CACHE_SIZE", "10000"))
+FEEDBACK_CACHE_TTL = float(getenv("FEEDBACK_CACHE_TTL", "3600"))
+FEEDBACK_BATCH_SIZE = int(getenv("FEEDBACK_BATCH_SIZE", "100"))
+FEEDBACK_FLUSH_INTERVAL = float(getenv("FEEDBACK_FLUSH_INTERVAL", "0.005"))
+FEEDBACK_RETENTION = int(getenv("FEEDBACK_RETENTION", "7776000"))
+FEEDBACK_ARCHIVE_INTERVAL = float(getenv("FEEDBACK_ARCHIVE_INTERVAL", "3600"))
 
 SPREADSHEET_ID = getenv("SPREADSHEET_ID")
 GOOGLE_SERVICE_ACCOUNT_FILENAME = getenv("GOOGLE_SERVICE_ACCOUNT_FILENAME")
+SHEETS_FLUSH_INTERVAL = float(getenv("SHEETS_FLUSH_INTERVAL", "2"))
+SHEETS_WORKSHEET_CACHE_TTL = float(getenv("SHEETS_WORKSHEET_CACHE_TTL", "600"))
 
 WORK_HOURS_START = getenv("WORK_HOURS_START", "09:00")
 WORK_HOURS_END = getenv("WORK_HOURS_END", "17:00")
 TIMEZONE_OFFSET = int(getenv("TIMEZONE_OFFSET", "3"))
 
 AFTER_HOURS_PHONE = getenv("AFTER_HOURS_PHONE")
+
+QUEUE_RECONCILE_INTERVAL = float(getenv("QUEUE_RECONCILE_INTERVAL", "300"))
+TASKS_RECOUNT_INTERVAL = float(getenv("TASKS_RECOUNT_INTERVAL", "3600"))
+
+OUTBOX_CONCURRENCY = int(getenv("OUTBOX_CONCURRENCY", "32"))
+OUTBOX_MAX_ATTEMPTS = int(getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_POLL_INTERVAL = float(getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_LEASE = float(getenv("OUTBOX_LEASE", "600"))
+OUTBOX_RETENTION = int(getenv("OUTBOX_RETENTION", "604800"))
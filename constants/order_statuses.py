@@ -27,3 +27,20 @@ ORDER_STATUS_SPREADSHEET_NAMES: dict[OrderStatus, str] = {
     OrderStatus.COMPLETED: "Виконано",
     OrderStatus.CANCELLED: "Скасовано",
 }
+
+# Statuses an admin can set from the request card, a cancelled request is final
+ADMIN_STATUS_TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    status: {
+        new_status
+        for new_status in OrderStatus
+        if new_status not in (status, OrderStatus.CANCELLED)
+    }
+    for status in OrderStatus
+    if status != OrderStatus.CANCELLED
+}
+
+# A user can cancel a request only before the work on it started
+USER_STATUS_TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    OrderStatus.WAITING: {OrderStatus.CANCELLED},
+    OrderStatus.CLARIFICATION: {OrderStatus.CANCELLED},
+}
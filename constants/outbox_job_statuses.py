@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class OutboxJobStatus(Enum):
+    PENDING = "PENDING"
+    DONE = "DONE"
+    FAILED = "FAILED"
@@ -1,19 +1,247 @@
+from datetime import datetime, timezone
+from typing import Any
+
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.errors import BulkWriteError, OperationFailure
 
-from config import MONGO_URI
+from config import FSM_STATE_TTL, MONGO_DB_NAME, MONGO_URI, OUTBOX_RETENTION
+from constants.order_statuses import OrderStatus
+from constants.order_types import OrderType
+from constants.outbox_job_statuses import OutboxJobStatus
+from mongo_profiler import mongo_command_stats
 from schemas.request import Request
-from schemas.feedback import Feedback
+from utils.get_queue_positions import OPEN_ORDER_STATUSES
+from utils.get_winning_plan_stages import get_winning_plan_stages
+from utils.str_to_digits_id import srt_to_digits_id
+
+db_client = AsyncIOMotorClient(MONGO_URI, event_listeners=[mongo_command_stats])
+db = db_client[MONGO_DB_NAME]
+
+BACKFILL_BATCH_SIZE = 1000
+
+# _id of the migrations document recorded when the digits_id backfill is done
+DIGITS_ID_BACKFILL = "request_digits_ids"
+
+
+# Indexes every collection must have, including the ones the hot queries rely on
+INDEXES: dict[str, list[IndexModel]] = {
+    "requests": [
+        # /status
+        IndexModel([("user_id", 1), ("timestamp", -1)]),
+        # /cancel
+        IndexModel(
+            "digits_id",
+            unique=True,
+            partialFilterExpression={"digits_id": {"$type": "string"}},
+        ),
+        # Queue positions
+        IndexModel([("problem_type", 1), ("status", 1), ("timestamp", 1)]),
+        # /tasks and loading open queues
+        IndexModel([("status", 1), ("problem_type", 1)]),
+        # Resubmitted request forms
+        IndexModel(
+            "form_id",
+            unique=True,
+            partialFilterExpression={"form_id": {"$type": "string"}},
+        ),
+        # Relaying outbox jobs saved with the requests
+        IndexModel("pending_jobs.key", sparse=True),
+    ],
+    "feedback": [
+        IndexModel("admin_message_id"),
+        IndexModel([("user_id", 1), ("user_message_id", 1)]),
+    ],
+    "feedback_archive": [
+        IndexModel("admin_message_id"),
+        IndexModel([("user_id", 1), ("user_message_id", 1)]),
+    ],
+    "sheet_rows": [
+        IndexModel([("sheet_name", 1), ("request_id", 1)], unique=True),
+    ],
+    "fsm_states": [
+        IndexModel("updated_at", expireAfterSeconds=FSM_STATE_TTL),
+    ],
+    "outbox": [
+        IndexModel("key", unique=True),
+        IndexModel([("status", 1), ("next_attempt_at", 1)]),
+        IndexModel("done_at", expireAfterSeconds=OUTBOX_RETENTION),
+    ],
+}
+
+COMPARED_INDEX_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression")
+
+# Representative hot queries whose plans must use an index
+HOT_QUERIES: list[dict[str, Any]] = [
+    {
+        "find": "requests",
+        "filter": {
+            "user_id": 0,
+            "status": {"$in": OPEN_ORDER_STATUSES},
+            "$or": [
+                {"timestamp": {"$lt": datetime(2000, 1, 1)}},
+                {"timestamp": datetime(2000, 1, 1), "_id": {"$lt": ObjectId()}},
+            ],
+        },
+        "sort": {"timestamp": -1, "_id": -1},
+        "limit": 6,
+    },
+    {"find": "requests", "filter": {"user_id": 0, "digits_id": "R000000"}},
+    {
+        "aggregate": "requests",
+        "pipeline": [
+            {
+                "$match": {
+                    "$or": [
+                        {
+                            "problem_type": OrderType.OTHER.value,
+                            "status": {"$in": OPEN_ORDER_STATUSES},
+                            "timestamp": {"$lt": datetime(2000, 1, 1)},
+                        }
+                    ]
+                }
+            },
+            {"$project": {"_id": 0, "problem_type": 1, "timestamp": 1}},
+        ],
+        "cursor": {},
+    },
+    {
+        "aggregate": "requests",
+        "pipeline": [
+            {"$match": {"status": OrderStatus.IN_PROGRESS.value}},
+            {"$group": {"_id": "$problem_type", "count": {"$sum": 1}}},
+        ],
+        "cursor": {},
+    },
+    {"find": "requests", "filter": {"status": {"$in": OPEN_ORDER_STATUSES}}},
+    {"find": "requests", "filter": {"pending_jobs.key": {"$exists": True}}},
+    {"find": "feedback", "filter": {"admin_message_id": 0}},
+    {"find": "feedback", "filter": {"user_id": 0, "user_message_id": 0}},
+    {
+        "find": "sheet_rows",
+        "filter": {"sheet_name": "", "request_id": {"$in": ["R000000"]}},
+    },
+    {
+        "find": "outbox",
+        "filter": {
+            "status": OutboxJobStatus.PENDING.value,
+            "next_attempt_at": {"$lte": datetime(2000, 1, 1)},
+        },
+        "sort": {"next_attempt_at": 1},
+    },
+]
+
+
+async def setup_indexes(db: Database) -> None:
+    """
+    Creates the declared indexes and reports indexes that are missing,
+    differ from the declaration or are not declared at all.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection: Collection = db[collection_name]
+
+        try:
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            print(f"Could not create indexes on {collection_name}: {e}")
+
+        existing = {index["name"]: index async for index in collection.list_indexes()}
+        declared = {index.document["name"]: index.document for index in indexes}
+
+        for name in declared.keys() - existing.keys():
+            print(f"Index {collection_name}.{name} is missing")
 
-db_client = AsyncIOMotorClient(MONGO_URI)
-db = db_client["studmisto"]
+        for name in existing.keys() - declared.keys() - {"_id_"}:
+            print(f"Index {collection_name}.{name} is not declared in INDEXES")
 
+        for name in declared.keys() & existing.keys():
+            declared_index = declared[name]
+            existing_index = existing[name]
+
+            is_same = list(declared_index["key"].items()) == list(
+                existing_index["key"].items()
+            ) and all(
+                declared_index.get(option) == existing_index.get(option)
+                for option in COMPARED_INDEX_OPTIONS
+            )
+            if not is_same:
+                print(
+                    f"Index {collection_name}.{name} differs from the declaration: "
+                    f"{dict(existing_index)}"
+                )
+
+
+async def check_query_plans(db: Database) -> None:
+    """
+    Explains the hot queries and reports the ones that fall back to a collection scan.
+    """
+    for query in HOT_QUERIES:
+        try:
+            explain = await db.command({"explain": query, "verbosity": "queryPlanner"})
+        except OperationFailure as e:
+            print(f"Could not explain {query}: {e}")
+            continue
+
+        if "COLLSCAN" in get_winning_plan_stages(explain):
+            print(f"Query falls back to COLLSCAN: {query}")
+
+
+async def backfill_request_digits_ids(db: Database) -> None:
+    """
+    Stores digits_id on requests created before it was saved on insert.
+    Requests whose digits ID is already taken by another request are left without it
+    and marked with digits_id_collision. Which of the colliding requests keeps the ID
+    is not defined, /cancel finds the others by hashing their _id.
+    Runs once: new requests always get digits_id, so a finished backfill is recorded
+    and later startups skip the unindexed scan.
+    """
+    if await db.migrations.find_one({"_id": DIGITS_ID_BACKFILL}) is not None:
+        return
 
-def setup_indexes(db: Database):
     db_requests: Collection[Request] = db.requests
-    db_requests.create_index("user_id")
+    cursor = db_requests.find(
+        {"digits_id": {"$exists": False}, "digits_id_collision": {"$ne": True}},
+        {"_id": 1},
+    ).sort("_id", 1)
+
+    request_ids = []
+    async for request in cursor:
+        request_ids.append(request["_id"])
+
+        if len(request_ids) >= BACKFILL_BATCH_SIZE:
+            await _apply_backfill(db_requests, request_ids)
+            request_ids = []
+
+    if request_ids:
+        await _apply_backfill(db_requests, request_ids)
+
+    await db.migrations.update_one(
+        {"_id": DIGITS_ID_BACKFILL},
+        {"$set": {"done_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+async def _apply_backfill(collection: Collection, request_ids: list[ObjectId]) -> None:
+    operations = [
+        UpdateOne(
+            {"_id": request_id},
+            {"$set": {"digits_id": srt_to_digits_id(str(request_id))}},
+        )
+        for request_id in request_ids
+    ]
+
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        collided_ids = [
+            request_ids[error["index"]] for error in e.details.get("writeErrors", [])
+        ]
+        print(f"Digits ID collisions, requests left without digits_id: {collided_ids}")
 
-    db_feedback: Collection[Feedback] = db.feedback
-    db_feedback.create_index("admin_message_id")
-    db_feedback.create_index([("user_id", 1), ("user_message_id", 1)])
+        await collection.update_many(
+            {"_id": {"$in": collided_ids}}, {"$set": {"digits_id_collision": True}}
+        )
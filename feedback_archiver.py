@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+
+from config import FEEDBACK_ARCHIVE_INTERVAL, FEEDBACK_RETENTION
+from database import db
+from schemas.feedback import Feedback
+from utils.periodic_task import PeriodicTask
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+class FeedbackArchiver:
+    """
+    Moves feedback mappings older than the retention period to the archive collection,
+    so the hot collection and its indexes only hold recent conversations.
+    Mappings are selected by the creation time in their ObjectId.
+    """
+
+    def __init__(
+        self,
+        feedback: Collection[Feedback],
+        archive: Collection[Feedback],
+        retention: float = FEEDBACK_RETENTION,
+    ) -> None:
+        self.feedback = feedback
+        self.archive = archive
+        self.retention = retention
+        self._task: Optional[PeriodicTask] = None
+
+    async def archive_old_mappings(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        query = {"_id": {"$lt": ObjectId.from_datetime(cutoff)}}
+        archived = 0
+
+        while True:
+            mappings = (
+                await self.feedback.find(query)
+                .sort("_id", 1)
+                .limit(ARCHIVE_BATCH_SIZE)
+                .to_list(length=ARCHIVE_BATCH_SIZE)
+            )
+            if not mappings:
+                return archived
+
+            # Upserts keep a retry after a crash between the two writes idempotent
+            await self.archive.bulk_write(
+                [
+                    ReplaceOne({"_id": mapping["_id"]}, mapping, upsert=True)
+                    for mapping in mappings
+                ],
+                ordered=False,
+            )
+            await self.feedback.delete_many(
+                {"_id": {"$in": [mapping["_id"] for mapping in mappings]}}
+            )
+
+            archived += len(mappings)
+
+    def start(self, interval: float = FEEDBACK_ARCHIVE_INTERVAL) -> None:
+        if self._task is None:
+            self._task = PeriodicTask(
+                "feedback_archiver",
+                self.archive_old_mappings,
+                interval,
+                run_at_start=True,
+            )
+            self._task.start()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            await self._task.stop()
+            self._task = None
+
+
+feedback_archiver = FeedbackArchiver(db.feedback, db.feedback_archive)
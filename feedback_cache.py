@@ -0,0 +1,89 @@
+from typing import Optional
+
+from config import FEEDBACK_CACHE_SIZE, FEEDBACK_CACHE_TTL
+from metrics import Counter, Gauge, registry
+from utils.lru_cache import LRUCache
+
+feedback_cache_lookups = registry.register(
+    Counter(
+        "bot_feedback_cache_lookups_total",
+        "Feedback mapping lookups by direction and result",
+        ("direction", "result"),
+    )
+)
+feedback_cache_size = registry.register(
+    Gauge(
+        "bot_feedback_cache_size",
+        "Feedback mappings held in the cache",
+        ("direction",),
+    )
+)
+
+
+class FeedbackMappingCache:
+    """
+    In-process cache of user <-> admin message mappings in both directions.
+    User -> admin mappings are unique and written through by store_message_mapping.
+    One admin message (e.g. a request card) can be mapped to several user messages,
+    so admin -> user mappings are only cached from lookup results, which pick
+    the earliest mapping, and an evicted entry is never replaced by a later one.
+    """
+
+    def __init__(
+        self, maxsize: int = FEEDBACK_CACHE_SIZE, ttl: float = FEEDBACK_CACHE_TTL
+    ) -> None:
+        # admin_message_id -> (user_id, user_message_id)
+        self._by_admin_message = LRUCache(maxsize, ttl)
+        # (user_id, user_message_id) -> admin_message_id
+        self._by_user_message = LRUCache(maxsize, ttl)
+
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, user_id: int, user_message_id: int, admin_message_id: int) -> None:
+        self._by_user_message.set((user_id, user_message_id), admin_message_id)
+
+    def put_user_message(
+        self, admin_message_id: int, user_id: int, user_message_id: int
+    ) -> None:
+        self._by_admin_message.set(admin_message_id, (user_id, user_message_id))
+
+    def get_user_message(self, admin_message_id: int) -> Optional[tuple[int, int]]:
+        user_message = self._by_admin_message.get(admin_message_id)
+        self._count("admin_to_user", user_message is not None)
+
+        return user_message
+
+    def get_admin_message(self, user_id: int, user_message_id: int) -> Optional[int]:
+        admin_message_id = self._by_user_message.get((user_id, user_message_id))
+        self._count("user_to_admin", admin_message_id is not None)
+
+        return admin_message_id
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._by_admin_message) + len(self._by_user_message),
+        }
+
+    def update_size_metrics(self) -> None:
+        feedback_cache_size.set(len(self._by_admin_message), direction="admin_to_user")
+        feedback_cache_size.set(len(self._by_user_message), direction="user_to_admin")
+
+    def _count(self, direction: str, is_hit: bool) -> None:
+        if is_hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        feedback_cache_lookups.inc(
+            direction=direction, result="hit" if is_hit else "miss"
+        )
+
+
+feedback_cache = FeedbackMappingCache()
+registry.add_collector(feedback_cache.update_size_metrics)
@@ -11,6 +11,9 @@ from aiogram.exceptions import TelegramBadRequest
 from pymongo.database import Database
 
 from config import ADMIN_CHAT_ID, CHAT_THREAD_FEEDBACK
+from feedback_cache import feedback_cache
+from feedback_write_buffer import feedback_write_buffer
+from schemas.feedback import Feedback
 
 
 async def store_message_mapping(
@@ -20,43 +23,72 @@ async def store_message_mapping(
     admin_message_id: int,
     info_message_id: Optional[int] = None,
     is_info_message_admin: Optional[bool] = None,
+    wait_for_write: bool = False,
 ) -> None:
+    """
+    Mappings are written by feedback_write_buffer in the background,
+    wait_for_write waits until they are saved in Mongo.
+    """
     if (info_message_id is not None) != (is_info_message_admin is not None):
         raise ValueError(
             "Both info_message_id and is_info_message_admin must be set together."
         )
 
-    message_mapping = {
-        "user_id": user_id,
-        "user_message_id": user_message_id,
-        "admin_message_id": admin_message_id,
-    }
-
-    if info_message_id is None:
-        await db.feedback.insert_one(message_mapping)
-        return
-
-    if is_info_message_admin:
-        info_user_message = user_message_id
-        info_admin_message = info_message_id
-    else:
-        info_user_message = info_message_id
-        info_admin_message = admin_message_id
+    message_mappings: list[Feedback] = [
+        {
+            "user_id": user_id,
+            "user_message_id": user_message_id,
+            "admin_message_id": admin_message_id,
+        }
+    ]
+
+    if info_message_id is not None:
+        if is_info_message_admin:
+            info_user_message = user_message_id
+            info_admin_message = info_message_id
+        else:
+            info_user_message = info_message_id
+            info_admin_message = admin_message_id
+
+        message_mappings.append(
+            {
+                "user_id": user_id,
+                "user_message_id": info_user_message,
+                "admin_message_id": info_admin_message,
+            }
+        )
 
-    info_message_mapping = {
-        "user_id": user_id,
-        "user_message_id": info_user_message,
-        "admin_message_id": info_admin_message,
-    }
+    for message_mapping in message_mappings:
+        feedback_cache.put(
+            message_mapping["user_id"],
+            message_mapping["user_message_id"],
+            message_mapping["admin_message_id"],
+        )
 
-    await db.feedback.insert_many([message_mapping, info_message_mapping])
+    await feedback_write_buffer.add(message_mappings, wait=wait_for_write)
 
 
 async def get_user_message_id(
     db: Database, admin_message_id: int
 ) -> tuple[int, int] | tuple[None, None]:
-    doc = await db.feedback.find_one({"admin_message_id": admin_message_id})
+    user_message = feedback_cache.get_user_message(admin_message_id)
+    if user_message is not None:
+        return user_message
+
+    # A request card is mapped to several user messages, the earliest mapping wins.
+    # Unflushed mappings are newer than the saved ones, archived are older
+    query = {"admin_message_id": admin_message_id}
+
+    doc = await db.feedback.find_one(query, sort=[("_id", 1)])
+    if doc is None:
+        doc = await db.feedback_archive.find_one(query, sort=[("_id", 1)])
+    if doc is None:
+        doc = feedback_write_buffer.find_by_admin_message(admin_message_id)
+
     if doc:
+        feedback_cache.put_user_message(
+            admin_message_id, doc["user_id"], doc["user_message_id"]
+        )
         return doc["user_id"], doc["user_message_id"]
 
     return None, None
@@ -65,11 +97,23 @@ async def get_user_message_id(
 async def get_admin_message_id(
     db: Database, user_id: int, user_message_id: int
 ) -> Optional[int]:
-    doc = await db.feedback.find_one(
-        {"user_id": user_id, "user_message_id": user_message_id}
-    )
+    admin_message_id = feedback_cache.get_admin_message(user_id, user_message_id)
+    if admin_message_id is not None:
+        return admin_message_id
+
+    query = {"user_id": user_id, "user_message_id": user_message_id}
+
+    doc = feedback_write_buffer.find_by_user_message(user_id, user_message_id)
+    if doc is None:
+        doc = await db.feedback.find_one(query)
+    if doc is None:
+        doc = await db.feedback_archive.find_one(query)
+
+    if not doc:
+        return None
 
-    return doc["admin_message_id"] if doc else None
+    feedback_cache.put(user_id, user_message_id, doc["admin_message_id"])
+    return doc["admin_message_id"]
 
 
 async def send_message_with_reply(
@@ -0,0 +1,175 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from pymongo import InsertOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from config import FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL
+from database import db
+from metrics import Counter, registry
+from middlewares.handler_context import current_handler
+from schemas.feedback import Feedback
+
+feedback_writes = registry.register(
+    Counter(
+        "bot_feedback_writes_total",
+        "Feedback mappings written by the write-behind buffer",
+        ("outcome",),
+    )
+)
+feedback_flushes = registry.register(
+    Counter("bot_feedback_flushes_total", "Bulk writes of feedback mappings")
+)
+
+
+class FeedbackWriteBuffer:
+    """
+    Write-behind buffer for feedback mappings. Mappings stored by concurrent handlers
+    are inserted together with one unordered bulk_write once flush_interval passes
+    or max_batch mappings are pending. Until then they are served by find_*.
+    """
+
+    def __init__(
+        self,
+        collection: Collection[Feedback],
+        max_batch: int = FEEDBACK_BATCH_SIZE,
+        flush_interval: float = FEEDBACK_FLUSH_INTERVAL,
+    ) -> None:
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._pending: list[tuple[Feedback, asyncio.Future]] = []
+        self._writing: list[tuple[Feedback, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._is_stopping = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._is_stopping = False
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Writes every pending mapping and stops the buffer.
+        """
+        if self._task is None:
+            return
+
+        self._is_stopping = True
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def add(self, documents: list[Feedback], wait: bool = False) -> None:
+        """
+        Queues the mappings. With wait, returns only once they are written
+        and raises if the write failed.
+        """
+        if self._task is None or self._is_stopping:
+            await self.collection.insert_many(documents)
+            return
+
+        loop = asyncio.get_running_loop()
+        futures = []
+
+        for document in documents:
+            future = loop.create_future()
+            # Nobody may await the result, so the exception is marked as retrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+            self._pending.append((document, future))
+            futures.append(future)
+
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+        if wait:
+            await asyncio.gather(*futures)
+
+    def find_by_admin_message(self, admin_message_id: int) -> Optional[Feedback]:
+        return self._find(lambda doc: doc["admin_message_id"] == admin_message_id)
+
+    def find_by_user_message(
+        self, user_id: int, user_message_id: int
+    ) -> Optional[Feedback]:
+        return self._find(
+            lambda doc: doc["user_id"] == user_id
+            and doc["user_message_id"] == user_message_id
+        )
+
+    def _find(self, predicate: Any) -> Optional[Feedback]:
+        # The oldest match, like find_one in insertion order
+        for document, _ in self._writing + self._pending:
+            if predicate(document):
+                return document
+
+        return None
+
+    async def _run(self) -> None:
+        current_handler.set("feedback_write_buffer")
+
+        while True:
+            await self._wakeup.wait()
+
+            if not self._is_stopping and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(
+                        self._full.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+            self._writing = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            if not self._pending:
+                self._wakeup.clear()
+
+            if self._writing:
+                await self._flush(self._writing)
+                self._writing = []
+
+            if self._is_stopping and not self._pending:
+                return
+
+    async def _flush(self, batch: list[tuple[Feedback, asyncio.Future]]) -> None:
+        errors: Dict[int, Exception] = {}
+
+        try:
+            await self.collection.bulk_write(
+                [InsertOne(document) for document, _ in batch], ordered=False
+            )
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                print(f"Could not write a feedback mapping: {error}")
+                errors[error["index"]] = e
+        except Exception as e:
+            print(f"Could not write {len(batch)} feedback mappings: {e}")
+            errors = {i: e for i in range(len(batch))}
+
+        feedback_flushes.inc()
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+
+            error = errors.get(i)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+            feedback_writes.inc(outcome="ok" if error is None else "error")
+
+
+feedback_write_buffer = FeedbackWriteBuffer(db.feedback)
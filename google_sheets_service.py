@@ -1,9 +1,16 @@
+import re
 from datetime import datetime
+from threading import Lock
+from time import monotonic
 import gspread
 from google.oauth2.service_account import Credentials
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from config import GOOGLE_SERVICE_ACCOUNT_FILENAME, SPREADSHEET_ID
+from config import (
+    GOOGLE_SERVICE_ACCOUNT_FILENAME,
+    SPREADSHEET_ID,
+    SHEETS_WORKSHEET_CACHE_TTL,
+)
 from constants.order_statuses import ORDER_STATUS_SPREADSHEET_NAMES, OrderStatus
 from constants.order_types import ORDER_TYPE_NAMES, OrderType
 
@@ -27,76 +34,293 @@ WORKSHEET_TITLE_ROW = [
 ]
 
 
-creds = Credentials.from_service_account_file(
-    GOOGLE_SERVICE_ACCOUNT_FILENAME, scopes=SCOPES
-)
+_spreadsheet: Optional[gspread.Spreadsheet] = None
+_worksheets: Dict[str, gspread.Worksheet] = {}
+_worksheets_loaded_at = 0.0
+_lock = Lock()
+
+
+def get_spreadsheet() -> gspread.Spreadsheet:
+    """
+    Authorises the client and opens the spreadsheet on first use.
+    """
+    global _spreadsheet
+
+    with _lock:
+        if _spreadsheet is None:
+            creds = Credentials.from_service_account_file(
+                GOOGLE_SERVICE_ACCOUNT_FILENAME, scopes=SCOPES
+            )
+            _spreadsheet = gspread.authorize(creds).open_by_key(SPREADSHEET_ID)
+
+        return _spreadsheet
 
-gc = gspread.authorize(creds)
-sh = gc.open_by_key(SPREADSHEET_ID)
 
+def _load_worksheets() -> None:
+    global _worksheets_loaded_at
 
-def add_order_to_sheet(order_id: str, telegram_url: str, order: Dict[str, Any]) -> None:
+    worksheets = get_spreadsheet().worksheets()
+
+    with _lock:
+        _worksheets.clear()
+        _worksheets.update({worksheet.title: worksheet for worksheet in worksheets})
+        _worksheets_loaded_at = monotonic()
+
+
+def invalidate_worksheet(sheet_name: str) -> None:
+    global _worksheets_loaded_at
+
+    with _lock:
+        _worksheets.pop(sheet_name, None)
+        _worksheets_loaded_at = 0.0
+
+
+def get_worksheet(sheet_name: str) -> gspread.Worksheet:
     """
-    Adds a new order to the appropriate Google Sheet tab based on problem type. Returns the row number.
+    Returns a cached worksheet handle. All handles are reloaded with one metadata request
+    when the cache expires or the requested title is missing from it.
     """
-    problem_type = OrderType(order["problem_type"])
-    order_status = OrderStatus(order["status"])
+    is_expired = monotonic() - _worksheets_loaded_at > SHEETS_WORKSHEET_CACHE_TTL
 
-    sheet_name = ORDER_TYPE_NAMES.get(problem_type)
-    order_status_str = ORDER_STATUS_SPREADSHEET_NAMES[order_status]
+    if is_expired or sheet_name not in _worksheets:
+        _load_worksheets()
 
-    is_sheet_created = False
+    worksheet = _worksheets.get(sheet_name)
+    if worksheet is None:
+        raise gspread.exceptions.WorksheetNotFound(sheet_name)
 
-    try:
-        worksheet = sh.worksheet(sheet_name)
-    except gspread.exceptions.WorksheetNotFound:
-        worksheet = sh.add_worksheet(title=sheet_name, rows=1, cols=10)
-        worksheet.append_row(WORKSHEET_TITLE_ROW)
-        is_sheet_created = True
+    return worksheet
+
+
+def format_order_row(order_id: str, telegram_url: str, order: Dict[str, Any]) -> list:
+    order_status = OrderStatus(order["status"])
 
-    row = [
+    return [
         order_id,
         order["name"],
         order["phone"],
         order["dorm"],
         order.get("details", ""),
-        order_status_str,
+        ORDER_STATUS_SPREADSHEET_NAMES[order_status],
         telegram_url,
         order["timestamp"].strftime("%d.%m.%Y %H:%M"),
         order["edit_timestamp"].strftime("%d.%m.%Y %H:%M"),
     ]
 
-    worksheet.append_row(row)
 
-    if is_sheet_created:
+def get_or_create_worksheet(sheet_name: str) -> gspread.Worksheet:
+    try:
+        return get_worksheet(sheet_name)
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet = get_spreadsheet().add_worksheet(title=sheet_name, rows=1, cols=10)
+        worksheet.append_row(WORKSHEET_TITLE_ROW)
         worksheet.freeze(1)
 
+        with _lock:
+            _worksheets[sheet_name] = worksheet
 
-def update_order_status_in_sheet(
-    request_id: str,
-    new_status: OrderStatus,
-    problem_type: OrderType,
-    edit_timestamp: datetime,
-):
+        return worksheet
+
+
+def cell_range(sheet_name: str, row: int, col: int) -> str:
+    return f"'{sheet_name}'!{gspread.utils.rowcol_to_a1(row, col)}"
+
+
+def get_first_updated_row(append_response: Dict[str, Any]) -> Optional[int]:
     """
-    Updates the status of an order in the appropriate Google Sheet tab by request_id.
+    Extracts the first row number from the updatedRange of a values.append response,
+    e.g. 12 from "'Електрика'!A12:I14".
     """
-    status_name = ORDER_STATUS_SPREADSHEET_NAMES[new_status]
-    sheet_name = ORDER_TYPE_NAMES[problem_type]
-
-    worksheet = sh.worksheet(sheet_name)
-
-    cell = worksheet.find(request_id, in_column=REQUEST_ID_COLUMN)
-    if cell:
-        worksheet.update_cells(
-            [
-                gspread.Cell(cell.row, STATUS_COLUMN, status_name),
-                gspread.Cell(
-                    cell.row,
-                    EDIT_TIMESTAMP_COLUMN,
-                    edit_timestamp.strftime("%d.%m.%Y %H:%M"),
-                ),
-            ]
+    updated_range = append_response.get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+
+    return int(match.group(1)) if match else None
+
+
+class SheetsWriteBatch:
+    """
+    Collects order appends and status updates and writes them with as few API calls as possible:
+    one append_rows per worksheet, one values_batch_get to verify indexed rows and
+    one values_batch_update for every status change.
+    Repeated status changes of the same request are merged, so only the last one is written.
+    """
+
+    def __init__(self) -> None:
+        self.appends: Dict[str, Dict[str, list]] = {}
+        self.status_updates: Dict[str, Dict[str, tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return sum(map(len, self.appends.values())) + sum(
+            map(len, self.status_updates.values())
         )
-    else:
-        raise Exception("Column with request id not found in sheet: " + sheet_name)
+
+    def add_order(
+        self, order_id: str, telegram_url: str, order: Dict[str, Any]
+    ) -> None:
+        sheet_name = ORDER_TYPE_NAMES[OrderType(order["problem_type"])]
+        row = format_order_row(order_id, telegram_url, order)
+
+        self.appends.setdefault(sheet_name, {})[order_id] = row
+
+    def update_status(
+        self,
+        request_id: str,
+        new_status: OrderStatus,
+        problem_type: OrderType,
+        edit_timestamp: datetime,
+    ) -> None:
+        sheet_name = ORDER_TYPE_NAMES[problem_type]
+        status_name = ORDER_STATUS_SPREADSHEET_NAMES[new_status]
+        edit_timestamp_str = edit_timestamp.strftime("%d.%m.%Y %H:%M")
+
+        pending_row = self.appends.get(sheet_name, {}).get(request_id)
+        if pending_row is not None:
+            pending_row[STATUS_COLUMN - 1] = status_name
+            pending_row[EDIT_TIMESTAMP_COLUMN - 1] = edit_timestamp_str
+            return
+
+        self.status_updates.setdefault(sheet_name, {})[request_id] = (
+            status_name,
+            edit_timestamp_str,
+        )
+
+    def write_appends(
+        self,
+    ) -> tuple[Dict[str, Exception], Dict[str, Dict[str, int]]]:
+        """
+        Appends the collected rows. Returns errors keyed by request id and the row numbers
+        the new requests were written to, keyed by sheet name.
+        """
+        errors: Dict[str, Exception] = {}
+        appended_rows: Dict[str, Dict[str, int]] = {}
+
+        for sheet_name, rows in self.appends.items():
+            try:
+                try:
+                    worksheet = get_or_create_worksheet(sheet_name)
+                    response = worksheet.append_rows(list(rows.values()))
+                except gspread.exceptions.APIError:
+                    # The cached worksheet may have been deleted or renamed
+                    invalidate_worksheet(sheet_name)
+                    worksheet = get_or_create_worksheet(sheet_name)
+                    response = worksheet.append_rows(list(rows.values()))
+            except Exception as e:
+                errors.update(dict.fromkeys(rows, e))
+                continue
+
+            first_row = get_first_updated_row(response)
+            if first_row is None:
+                continue
+
+            appended_rows[sheet_name] = {
+                request_id: first_row + i for i, request_id in enumerate(rows)
+            }
+
+        return errors, appended_rows
+
+    def write_status_updates(
+        self, known_rows: Dict[str, Dict[str, int]]
+    ) -> tuple[Dict[str, Exception], Dict[str, Dict[str, int]]]:
+        """
+        Writes the collected status updates using the row numbers from the row index.
+        Known rows are verified against the ID cells with one read; a worksheet with a missing
+        or mismatched row is re-read in full. Returns errors keyed by request id and the
+        rebuilt row index of every re-read worksheet.
+        """
+        errors: Dict[str, Exception] = {}
+        rebuilt_rows: Dict[str, Dict[str, int]] = {}
+
+        rows: Dict[str, Dict[str, int]] = {}
+        stale_sheets = set()
+        checks = []
+
+        for sheet_name, updates in self.status_updates.items():
+            rows[sheet_name] = {}
+            sheet_rows = known_rows.get(sheet_name, {})
+
+            for request_id in updates:
+                row = sheet_rows.get(request_id)
+                if row is None:
+                    stale_sheets.add(sheet_name)
+                else:
+                    checks.append((sheet_name, request_id, row))
+
+        if checks:
+            try:
+                response = get_spreadsheet().values_batch_get(
+                    [
+                        cell_range(sheet_name, row, REQUEST_ID_COLUMN)
+                        for sheet_name, _, row in checks
+                    ]
+                )
+                value_ranges = response.get("valueRanges", [])
+            except Exception as e:
+                print(e)
+                value_ranges = []
+
+            for i, (sheet_name, request_id, row) in enumerate(checks):
+                values = None
+                if i < len(value_ranges):
+                    values = value_ranges[i].get("values")
+
+                if values and values[0] and values[0][0] == request_id:
+                    rows[sheet_name][request_id] = row
+                else:
+                    stale_sheets.add(sheet_name)
+
+        for sheet_name in stale_sheets:
+            try:
+                worksheet = get_worksheet(sheet_name)
+                request_ids = worksheet.col_values(REQUEST_ID_COLUMN)
+            except Exception as e:
+                invalidate_worksheet(sheet_name)
+                for request_id in self.status_updates[sheet_name]:
+                    if request_id not in rows[sheet_name]:
+                        errors[request_id] = e
+                continue
+
+            rebuilt_rows[sheet_name] = {
+                request_id: row
+                for row, request_id in enumerate(request_ids, 1)
+                if row > 1 and request_id
+            }
+            rows[sheet_name].update(rebuilt_rows[sheet_name])
+
+        data = []
+
+        for sheet_name, updates in self.status_updates.items():
+            for request_id, (status_name, edit_timestamp_str) in updates.items():
+                if request_id in errors:
+                    continue
+
+                row = rows[sheet_name].get(request_id)
+                if row is None:
+                    errors[request_id] = Exception(
+                        "Column with request id not found in sheet: " + sheet_name
+                    )
+                    continue
+
+                data.append(
+                    {
+                        "range": cell_range(sheet_name, row, STATUS_COLUMN),
+                        "values": [[status_name]],
+                    }
+                )
+                data.append(
+                    {
+                        "range": cell_range(sheet_name, row, EDIT_TIMESTAMP_COLUMN),
+                        "values": [[edit_timestamp_str]],
+                    }
+                )
+
+        if data:
+            try:
+                get_spreadsheet().values_batch_update(
+                    {"valueInputOption": "RAW", "data": data}
+                )
+            except Exception as e:
+                for updates in self.status_updates.values():
+                    for request_id in updates:
+                        errors.setdefault(request_id, e)
+
+        return errors, rebuilt_rows
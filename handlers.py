@@ -1,4 +1,5 @@
-import re
+import asyncio
+
 from aiogram import F, Dispatcher, Router
 from aiogram.enums import ChatType
 from aiogram.types import (
@@ -7,23 +8,31 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     CallbackQuery,
 )
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from bson import ObjectId
 from datetime import datetime, timedelta, timezone
 from pymongo.database import Database
+from typing import Optional
 
 from feedback_service import (
     admin_feedback_reply_handler,
     send_feedback,
-    store_message_mapping,
     user_feedback_reply_handler,
 )
-from constants.dorms import DORM_KEYBOARD, DORM_RESPONSIBLES
+from constants.dorms import DORM_KEYBOARD
 from constants.order_types import OrderType, ORDER_TYPE_NAMES, ORDER_TYPE_CHAT_THREADS
-from constants.order_statuses import OrderStatus, ORDER_STATUS_NAMES
+from constants.order_statuses import (
+    ADMIN_STATUS_TRANSITIONS,
+    ORDER_STATUS_NAMES,
+    USER_STATUS_TRANSITIONS,
+    OrderStatus,
+)
+
+from config import ADMIN_CHAT_ID, TIMEZONE_OFFSET
 
-from config import ADMIN_CHAT_ID, AFTER_HOURS_PHONE, TIMEZONE_OFFSET
+from schemas.request import Request
 
 from states.feedback import FeedbackStates
 from states.request_form import RequestForm
@@ -31,21 +40,43 @@ from states.request_form import RequestForm
 from utils.back_btn import back_btn
 from utils.delete_last_message import delete_last_message
 from utils.extract_digits_id_from_text import extract_digits_id_from_text
-from utils.get_queue_position import get_queue_position
-from utils.get_status_keyboard import get_status_keyboard
+from utils.get_legacy_request_id import get_legacy_request_id
+from utils.get_request_digits_id import get_request_digits_id
 from utils.get_user_label import get_user_label
+from utils.get_user_requests_page import (
+    MAX_DETAILS_LENGTH,
+    OPEN_SEGMENT,
+    PageCursor,
+    get_user_requests_page,
+)
+from utils.insert_request import insert_request
 from utils.is_user_order_message import is_user_order_message
 from utils.is_valid_ukraine_phone import is_valid_ukraine_phone
-from utils.is_within_work_hours import is_within_work_hours
-from utils.str_to_digits_id import srt_to_digits_id
 
-from google_sheets_service import add_order_to_sheet, update_order_status_in_sheet
+from middlewares.handler_context import HandlerContextMiddleware
+from middlewares.metrics import HandlerMetricsMiddleware
+
+from open_queues import open_queues
+from order_rendering import PROBLEM_TYPE_KEYBOARD
+from status_transitions import StatusTransitionConflict, transition_status
+from task_counters import task_counters
+from outbox import outbox
+from outbox_jobs import REQUEST_CANCELLED, REQUEST_CREATED, STATUS_CHANGED
 
 router = Router()
 
 private_router = Router()
 private_router.message.filter(F.chat.type == ChatType.PRIVATE)
 
+for observer in (
+    router.message,
+    router.callback_query,
+    private_router.message,
+    private_router.callback_query,
+):
+    observer.middleware(HandlerContextMiddleware())
+    observer.middleware(HandlerMetricsMiddleware())
+
 
 cancel_order_btn = InlineKeyboardMarkup(
     inline_keyboard=[
@@ -60,6 +91,17 @@ cancel_feedback_btn = InlineKeyboardMarkup(
 )
 
 
+STATUS_PAGE_SIZE = 5
+
+
+def get_status_page_data(direction: str, page_request: tuple) -> str:
+    # Callback data is limited to 64 bytes, so only the segment and the request ID
+    # are kept and the request's timestamp and owner are read back by _id
+    segment, request = page_request
+
+    return f"page:{direction}:{segment}:{request['_id']}"
+
+
 def register_handlers(dp: Dispatcher, db: Database) -> None:
     dp.include_router(router)
     dp.include_router(private_router)
@@ -80,7 +122,10 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
             "Введіть ПІБ (наприклад: Іваненко Іван Іванович)",
             reply_markup=cancel_order_btn,
         )
-        await state.update_data(last_message_id=message.message_id)
+        # Identifies the submitted form, so submitting it again doesn't create a duplicate
+        await state.update_data(
+            last_message_id=message.message_id, form_id=str(ObjectId())
+        )
 
     @private_router.callback_query(F.data == "cancel_request")
     async def cancel_order(call: CallbackQuery, state: FSMContext) -> None:
@@ -122,21 +167,8 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
         await delete_last_message(call.message, state)
         await state.set_state(RequestForm.problem_type)
 
-        buttons = [
-            [
-                InlineKeyboardButton(
-                    text=ORDER_TYPE_NAMES[t], callback_data=f"ptype:{t.name}"
-                )
-            ]
-            for t in OrderType
-        ]
-        buttons.append(
-            [InlineKeyboardButton(text="⬅ Назад", callback_data="back:dorm")]
-        )
-
         message = await call.message.answer(
-            "Виберіть тип проблеми",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
+            "Виберіть тип проблеми", reply_markup=PROBLEM_TYPE_KEYBOARD
         )
         await state.update_data(dorm=selected_dorm, last_message_id=message.message_id)
 
@@ -161,25 +193,8 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
         data = await state.get_data()
 
         order_type = OrderType[data["problem_type"]]
-        thread_id = ORDER_TYPE_CHAT_THREADS[order_type]
-
-        forwarded_msg = None
-        if msg.content_type != "text":
-            forwarded_msg = await msg.forward(
-                ADMIN_CHAT_ID, message_thread_id=thread_id
-            )
-
         timestamp = datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)
 
-        if is_within_work_hours(timestamp):
-            info_msg = "Очікуйте на відповідь"
-        else:
-            info_msg = "Зараз неробочий час, тому вона буде розглянута вранці"
-
-            if AFTER_HOURS_PHONE:
-                info_msg += f". У разі аварійної ситуації телефонуйте за номером: {AFTER_HOURS_PHONE}"
-
-        forwarded_message_id = forwarded_msg.message_id if forwarded_msg else None
         user_id = msg.from_user.id
         username = msg.from_user.username
         full_name = (
@@ -188,13 +203,17 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
             else msg.from_user.first_name
         )
 
+        [queue_position] = await open_queues.get_positions(
+            db.requests, [(order_type, timestamp)]
+        )
+
         order_data = {
             "name": data["name"],
             "phone": data["phone"],
             "dorm": data["dorm"],
             "problem_type": data["problem_type"],
             "details": msg.text or msg.caption,
-            "forwarded_message_id": forwarded_msg.message_id if forwarded_msg else None,
+            "forwarded_message_id": None,
             "status": OrderStatus.WAITING.value,
             "timestamp": timestamp,
             "edit_timestamp": timestamp,
@@ -202,175 +221,89 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
             "user_id": user_id,
             "username": username,
             "full_name": full_name,
+            "form_id": data.get("form_id") or str(ObjectId()),
+            "pending_jobs": [
+                outbox.pending_job(
+                    REQUEST_CREATED,
+                    {
+                        "chat_id": msg.chat.id,
+                        "message_id": msg.message_id,
+                        "has_media": msg.content_type != "text",
+                        "thread_id": ORDER_TYPE_CHAT_THREADS[order_type],
+                        "queue_position": queue_position,
+                    },
+                )
+            ],
         }
 
-        result = await db.requests.insert_one(order_data)
-        request_id = str(result.inserted_id)
-        request_digits_id = srt_to_digits_id(request_id)
-
-        dorm_responsible = DORM_RESPONSIBLES.get(order_data["dorm"])
-        dorm_responsible_label = f", {dorm_responsible}" if dorm_responsible else ""
-        telegram_label = f"@{username}" if username else full_name
-
-        msg_text = (
-            f"Нова заявка #{request_digits_id}\n"
-            f"ПІБ: {order_data['name']}\n"
-            f"Телеграм: {telegram_label}\n"
-            f"Телефон: {order_data['phone']}\n"
-            f"Гуртожиток: {order_data['dorm']}\n"
-            f"Тип: {ORDER_TYPE_NAMES[order_type]}\n"
-        )
-
-        if forwarded_msg is None:
-            msg_text += f"Опис: {order_data['details']}\n"
+        request = await insert_request(db.requests, order_data)
+        open_queues.add(order_type, request["timestamp"], str(request["_id"]))
 
-        msg_text += (
-            f"Статус: {ORDER_STATUS_NAMES[OrderStatus.WAITING]}\n\n"
-            f"#гурт{order_data['dorm']}{dorm_responsible_label}"
-        )
-
-        queue_position = await get_queue_position(db.requests, order_type, timestamp)
-        user_message = await msg.answer(
-            f"Заявка #{request_digits_id} відправлена.\n"
-            f"{info_msg}. Якщо бажаєте додати більше інформації, відправте реплай на це повідомлення.\n"
-            f"Позиція в черзі: {queue_position}"
-        )
-        admin_message = await msg.bot.send_message(
-            ADMIN_CHAT_ID,
-            msg_text,
-            message_thread_id=thread_id,
-            reply_markup=get_status_keyboard(OrderStatus.WAITING, request_id),
-            parse_mode=None,
-        )
         await state.clear()
-        await store_message_mapping(
-            db,
-            msg.from_user.id,
-            user_message.message_id,
-            admin_message.message_id,
-            forwarded_message_id,
-            True if forwarded_msg else None,
-        )
-
-        admin_chat_id_str = re.sub(r"^-100", "", str(ADMIN_CHAT_ID))
-        telegram_url = (
-            f"https://t.me/c/{admin_chat_id_str}/{thread_id}/{admin_message.message_id}"
-        )
-
-        try:
-            add_order_to_sheet(request_digits_id, telegram_url, order_data)
-        except Exception as e:
-            print(e)
-            await msg.bot.send_message(
-                ADMIN_CHAT_ID,
-                "Не вдалось додати запис в таблицю",
-                message_thread_id=thread_id,
-            )
+        await outbox.relay(db.requests, request["_id"])
 
     @router.callback_query(F.data.startswith("status:"))
     async def update_status(call: CallbackQuery, state: FSMContext) -> None:
-        _, status_str, request_id = call.data.split(":")
-        status = OrderStatus[status_str]
-
-        request = await db.requests.find_one({"_id": ObjectId(request_id)})
-        if not request:
-            await call.answer("Заявку не знайдено", show_alert=True)
-            return
-
-        edit_timestamp = datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)
-
-        await db.requests.update_one(
-            {"_id": ObjectId(request_id)},
-            {
-                "$set": {
-                    "status": status.value,
-                    "set_status_user_id": call.from_user.id,
-                    "edit_timestamp": edit_timestamp,
-                }
-            },
-        )
+        # Cards posted before the status they were rendered with was added
+        # to the callback data don't guard against concurrent changes
+        expected_status = None
+        if call.data.count(":") == 3:
+            _, status_str, expected_status_str, request_id = call.data.split(":")
+            expected_status = OrderStatus[expected_status_str]
+        else:
+            _, status_str, request_id = call.data.split(":")
 
-        request_digits_id = srt_to_digits_id(request_id)
-        user_message = None
+        status = OrderStatus[status_str]
 
         try:
-            user_message = await call.bot.send_message(
-                request["user_id"],
-                f"Статус заявки #{request_digits_id} оновлено: {ORDER_STATUS_NAMES[status]}",
+            request = await transition_status(
+                db.requests,
+                {"_id": ObjectId(request_id)},
+                status,
+                call.from_user.id,
+                ADMIN_STATUS_TRANSITIONS,
+                pending_jobs=[
+                    outbox.pending_job(
+                        STATUS_CHANGED,
+                        {
+                            "status": status.value,
+                            "user_label": get_user_label(call),
+                            "admin_chat_id": call.message.chat.id,
+                            "admin_message_id": call.message.message_id,
+                        },
+                        key=call.id,
+                    )
+                ],
+                expected_status=expected_status,
             )
-        except Exception:
-            pass
+        except StatusTransitionConflict as e:
+            if e.current_status is None:
+                await call.answer("Заявку не знайдено", show_alert=True)
+            else:
+                await call.answer(
+                    f"Статус заявки вже змінено: {ORDER_STATUS_NAMES[e.current_status]}",
+                    show_alert=True,
+                )
+            return
 
         order_type = OrderType[request["problem_type"]]
+        open_queues.set_status(order_type, request["timestamp"], request_id, status)
 
-        dorm_responsible = DORM_RESPONSIBLES.get(request["dorm"])
-        dorm_responsible_label = f", {dorm_responsible}" if dorm_responsible else ""
-
-        username = request.get("username")
-        full_name = request.get("full_name")
-        telegram_label = f"@{username}" if username else full_name
-
-        # If order created before an update with saving usernames and full names in database
-        if telegram_label is None:
-            telegram_label = request.get("user_id")
-
-        msg_text = (
-            f"Заявка #{request_digits_id}\n"
-            f"ПІБ: {request['name']}\n"
-            f"Телеграм: {telegram_label}\n"
-            f"Телефон: {request['phone']}\n"
-            f"Гуртожиток: {request['dorm']}\n"
-            f"Тип: {ORDER_TYPE_NAMES[order_type]}\n"
-        )
-
-        if request["details"]:
-            msg_text += f"Опис: {request['details']}\n"
-
-        user_label = get_user_label(call)
-        msg_text += (
-            f"Статус: {ORDER_STATUS_NAMES[status]} [{user_label}]\n\n"
-            f"#гурт{request['dorm']}{dorm_responsible_label}"
-        )
-
-        await call.message.edit_text(
-            msg_text,
-            reply_markup=get_status_keyboard(status, request_id),
+        await asyncio.gather(
+            task_counters.apply_transition(
+                order_type, request["previous_status"], status.value
+            ),
+            outbox.relay(db.requests, request["_id"]),
         )
 
-        if user_message:
-            await store_message_mapping(
-                db, request["user_id"], user_message.message_id, call.message.message_id
-            )
-
-        try:
-            update_order_status_in_sheet(
-                request_digits_id, status, order_type, edit_timestamp
-            )
-        except Exception as e:
-            print(e)
-
     @private_router.callback_query(F.data.startswith("back:"))
     async def go_back(call: CallbackQuery, state: FSMContext) -> None:
         target = call.data.split(":")[1]
 
         if target == "problem_type":
             await state.set_state(RequestForm.problem_type)
-            buttons = [
-                [
-                    InlineKeyboardButton(
-                        text=ORDER_TYPE_NAMES[t], callback_data=f"ptype:{t.name}"
-                    )
-                ]
-                for t in OrderType
-            ]
-
-            buttons.append(
-                [InlineKeyboardButton(text="⬅ Назад", callback_data="back:dorm")]
-            )
-
             message = await call.message.edit_text(
-                "Виберіть тип проблеми",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
+                "Виберіть тип проблеми", reply_markup=PROBLEM_TYPE_KEYBOARD
             )
 
             await state.update_data(last_message_id=message.message_id)
@@ -398,68 +331,121 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
 
         await call.answer()
 
-    @router.message(Command("status"))
-    async def status(msg: Message) -> None:
-        user_id = msg.from_user.id
-        requests = (
-            await db.requests.find({"user_id": user_id})
-            .sort("timestamp", -1)
-            .to_list(length=None)
+    async def render_status_page(
+        user_id: int, after: Optional[PageCursor] = None, is_forward: bool = True
+    ) -> tuple[str, Optional[InlineKeyboardMarkup]]:
+        requests, has_more = await get_user_requests_page(
+            db.requests, user_id, after, is_forward, STATUS_PAGE_SIZE
         )
 
         if not requests:
-            await msg.answer("У вас немає заявок.")
-            return
+            return "У вас немає заявок.", None
 
-        response = f"Усього заявок: {len(requests)}\n\n"
+        open_requests = [
+            request for segment, request in requests if segment == OPEN_SEGMENT
+        ]
+        queue_positions = await open_queues.get_positions(
+            db.requests,
+            [
+                (OrderType[request["problem_type"]], request["timestamp"])
+                for request in open_requests
+            ],
+        )
+        queue_positions_by_id = {
+            request["_id"]: queue_position
+            for request, queue_position in zip(open_requests, queue_positions)
+        }
 
-        for request in requests:
+        total = await db.requests.count_documents({"user_id": user_id})
+        response = f"Усього заявок: {total}\n\n"
+
+        for _, request in requests:
             order_type = OrderType[request["problem_type"]]
             status = OrderStatus(request["status"])
-            request_id = str(request["_id"])
-            request_digits_id = srt_to_digits_id(request_id)
+            request_digits_id = get_request_digits_id(request)
 
             response += f"#{request_digits_id}\n"
             response += f"Тип: {ORDER_TYPE_NAMES[order_type]}\n"
             response += f"Гуртожиток: {request['dorm']}\n"
 
-            if request["details"]:
-                response += f"Опис: {request['details']}\n"
+            details = request["details"]
+            if details:
+                if len(details) > MAX_DETAILS_LENGTH:
+                    details = details[:MAX_DETAILS_LENGTH] + "…"
+
+                response += f"Опис: {details}\n"
 
             response += f"Статус: {ORDER_STATUS_NAMES[status]}\n"
 
-            if status == OrderStatus.IN_PROGRESS or status == OrderStatus.WAITING:
-                queue_position = await get_queue_position(
-                    db.requests, order_type, request["timestamp"]
-                )
+            queue_position = queue_positions_by_id.get(request["_id"])
+            if queue_position is not None:
                 response += f"Позиція в черзі: {queue_position}\n"
 
             response += "\n"
 
-        await msg.answer(response)
+        if is_forward:
+            has_previous, has_next = after is not None, has_more
+        else:
+            has_previous, has_next = has_more, True
+
+        buttons = []
+        if has_previous:
+            buttons.append(
+                InlineKeyboardButton(
+                    text="⬅️ Попередні",
+                    callback_data=get_status_page_data("prev", requests[0]),
+                )
+            )
+        if has_next:
+            buttons.append(
+                InlineKeyboardButton(
+                    text="Наступні ➡️",
+                    callback_data=get_status_page_data("next", requests[-1]),
+                )
+            )
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+        return response, keyboard
+
+    @router.message(Command("status"))
+    async def status(msg: Message) -> None:
+        response, keyboard = await render_status_page(msg.from_user.id)
+        await msg.answer(response, reply_markup=keyboard)
+
+    @router.callback_query(F.data.startswith("page:"))
+    async def status_page(call: CallbackQuery) -> None:
+        _, direction, segment, request_id = call.data.split(":")
+
+        cursor_request = await db.requests.find_one(
+            {"_id": ObjectId(request_id)}, {"user_id": 1, "timestamp": 1}
+        )
+        if cursor_request is None or cursor_request["user_id"] != call.from_user.id:
+            await call.answer("Це не ваш список заявок", show_alert=True)
+            return
+
+        after = (int(segment), cursor_request["timestamp"], cursor_request["_id"])
+        response, keyboard = await render_status_page(
+            call.from_user.id, after, direction == "next"
+        )
+
+        try:
+            await call.message.edit_text(response, reply_markup=keyboard)
+        except TelegramBadRequest as e:
+            if "message is not modified" not in e.message:
+                raise
+
+        await call.answer()
 
     @private_router.message(Command("tasks"))
     async def tasks(msg: Message) -> None:
-        total_in_progress = 0
-        in_progress_by_type = {}
-
-        pipeline = [
-            {"$match": {"status": OrderStatus.IN_PROGRESS.value}},
-            {"$group": {"_id": "$problem_type", "count": {"$sum": 1}}},
-        ]
-        async for doc in db.requests.aggregate(pipeline):
-            try:
-                order_type = OrderType[doc["_id"]]
-                count = doc["count"]
-                in_progress_by_type[order_type] = count
-                total_in_progress += count
-            except KeyError:
-                continue
+        in_progress_by_type = await task_counters.get()
+        total_in_progress = sum(in_progress_by_type.values())
 
         response = f"Заявки у роботі ({total_in_progress}):\n"
 
         for order_type in OrderType:
-            count = in_progress_by_type.get(order_type, 0)
+            count = in_progress_by_type[order_type]
             response += f"{ORDER_TYPE_NAMES[order_type]} – {count}\n"
 
         await msg.answer(response.rstrip())
@@ -503,89 +489,59 @@ def register_handlers(dp: Dispatcher, db: Database) -> None:
             return
 
         user_id = msg.from_user.id
-        requests = await db.requests.find({"user_id": user_id}).to_list(length=None)
-
-        order = None
-        for req in requests:
-            if srt_to_digits_id(str(req["_id"])) == digits_id:
-                order = req
-                break
-
-        if not order:
-            await msg.answer("Заявку не знайдено.")
-            return
 
-        status = order["status"]
-
-        if status == OrderStatus.CANCELLED.value:
-            await msg.answer("Заявка вже скасована!")
-            return
-
-        if status not in (OrderStatus.WAITING.value, OrderStatus.CLARIFICATION.value):
-            await msg.answer(
-                'Заявку можна скасувати лише якщо вона має статус "Очікує" або "Уточнення"!'
+        async def cancel(query: dict) -> Request:
+            return await transition_status(
+                db.requests,
+                {**query, "user_id": user_id},
+                OrderStatus.CANCELLED,
+                user_id,
+                USER_STATUS_TRANSITIONS,
+                pending_jobs=[
+                    outbox.pending_job(
+                        REQUEST_CANCELLED,
+                        {"user_message_id": msg.reply_to_message.message_id},
+                    )
+                ],
             )
-            return
-
-        edit_timestamp = datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)
-        await db.requests.update_one(
-            {"_id": order["_id"]},
-            {
-                "$set": {
-                    "status": OrderStatus.CANCELLED.value,
-                    "set_status_user_id": user_id,
-                    "edit_timestamp": edit_timestamp,
-                }
-            },
-        )
 
-        await msg.answer(f"Заявку #{digits_id} скасовано.")
-
-        mapping = await db.feedback.find_one(
-            {"user_id": user_id, "user_message_id": msg.reply_to_message.message_id}
-        )
-
-        admin_message_id = None
-        if mapping:
-            admin_message_id = mapping.get("admin_message_id")
-
-        dorm_responsible = DORM_RESPONSIBLES.get(order["dorm"])
-        dorm_responsible_label = f", {dorm_responsible}" if dorm_responsible else ""
+        try:
+            try:
+                order = await cancel({"digits_id": digits_id})
+            except StatusTransitionConflict as e:
+                legacy_request_id = None
+                if e.current_status is None:
+                    legacy_request_id = await get_legacy_request_id(
+                        db.requests, user_id, digits_id
+                    )
+                if legacy_request_id is None:
+                    raise
+
+                order = await cancel({"_id": legacy_request_id})
+        except StatusTransitionConflict as e:
+            if e.current_status is None:
+                await msg.answer("Заявку не знайдено.")
+            elif e.current_status == OrderStatus.CANCELLED:
+                await msg.answer("Заявка вже скасована!")
+            else:
+                await msg.answer(
+                    'Заявку можна скасувати лише якщо вона має статус "Очікує" або "Уточнення"!'
+                )
+            return
 
         order_type = OrderType[order["problem_type"]]
-        msg_text = (
-            f"Заявка #{digits_id}\n"
-            f"ПІБ: {order['name']}\n"
-            f"Телефон: {order['phone']}\n"
-            f"Гуртожиток: {order['dorm']}\n"
-            f"Тип: {ORDER_TYPE_NAMES[order_type]}\n"
+        open_queues.set_status(
+            order_type, order["timestamp"], str(order["_id"]), OrderStatus.CANCELLED
         )
 
-        if order.get("details"):
-            msg_text += f"Опис: {order['details']}\n"
-
-        msg_text += (
-            f"Статус: {ORDER_STATUS_NAMES[OrderStatus.CANCELLED]}\n\n"
-            f"#гурт{order['dorm']}{dorm_responsible_label}"
+        await asyncio.gather(
+            task_counters.apply_transition(
+                order_type, order["previous_status"], OrderStatus.CANCELLED.value
+            ),
+            msg.answer(f"Заявку #{digits_id} скасовано."),
+            outbox.relay(db.requests, order["_id"]),
         )
 
-        if admin_message_id:
-            try:
-                await msg.bot.edit_message_text(
-                    text=msg_text,
-                    chat_id=ADMIN_CHAT_ID,
-                    message_id=admin_message_id,
-                )
-            except Exception:
-                pass
-
-        try:
-            update_order_status_in_sheet(
-                digits_id, OrderStatus.CANCELLED, order_type, edit_timestamp
-            )
-        except Exception:
-            pass
-
     @private_router.message(F.reply_to_message)
     async def user_feedback_handler(msg: Message) -> None:
         await user_feedback_reply_handler(msg, db)
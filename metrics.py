@@ -0,0 +1,318 @@
+import asyncio
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Callable, Iterable, TypeVar
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the style of Prometheus.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the quantile by linear interpolation inside the bucket it falls into.
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+
+            cumulative += bucket_count
+
+        return self.buckets[-1]
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+
+    pairs = []
+    for name, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{name}="{value}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Metric family with a series per combination of label values.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterable[tuple[str, dict[str, str], float]]:
+        for key, value in self._series.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def expose(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._series[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class HistogramMetric(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = Histogram(self.buckets)
+
+        histogram.observe(value)
+
+    def time(self, **labels: Any) -> "Timer":
+        return Timer(self, labels)
+
+    def summaries(self) -> list[dict[str, Any]]:
+        return [
+            {**dict(zip(self.labelnames, key)), **histogram.summary()}
+            for key, histogram in self._series.items()
+        ]
+
+    def _samples(self) -> Iterable[tuple[str, dict[str, str], float]]:
+        for key, histogram in self._series.items():
+            labels = dict(zip(self.labelnames, key))
+
+            cumulative = 0
+            for upper, count in zip(
+                (*histogram.buckets, float("inf")), histogram.counts
+            ):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    {**labels, "le": format_value(upper)},
+                    cumulative,
+                )
+
+            yield f"{self.name}_sum", labels, histogram.sum
+            yield f"{self.name}_count", labels, histogram.count
+
+
+class Timer:
+    """
+    Observes the duration of the with block. If the metric has an outcome label,
+    it is set to "ok" or "error" depending on whether the block raised.
+    """
+
+    def __init__(self, metric: HistogramMetric, labels: dict[str, Any]) -> None:
+        self.metric = metric
+        self.labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *_: Any) -> None:
+        labels = self.labels
+        if "outcome" in self.metric.labelnames:
+            labels = {**labels, "outcome": "ok" if exc_type is None else "error"}
+
+        self.metric.observe(perf_counter() - self._start, **labels)
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: MetricType) -> MetricType:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Adds a function that refreshes gauges right before they are exposed.
+        """
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        for collector in self._collectors:
+            collector()
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+updates_total = registry.register(
+    Counter(
+        "bot_updates_total",
+        "Telegram updates processed by the dispatcher",
+        ("type", "outcome"),
+    )
+)
+updates_in_flight = registry.register(
+    Gauge("bot_updates_in_flight", "Telegram updates being processed")
+)
+updates_in_flight.set(0)
+updates_queued = registry.register(
+    Gauge("bot_updates_queued", "Webhook updates waiting for a worker")
+)
+update_duration = registry.register(
+    HistogramMetric(
+        "bot_update_duration_seconds",
+        "Time from feeding an update to the dispatcher until it is handled",
+        ("type",),
+    )
+)
+handler_duration = registry.register(
+    HistogramMetric(
+        "bot_handler_duration_seconds",
+        "Duration of aiogram handlers",
+        ("handler", "outcome"),
+    )
+)
+telegram_request_duration = registry.register(
+    HistogramMetric(
+        "bot_telegram_request_duration_seconds",
+        "Duration of Bot API requests, without rate limiter waits",
+        ("method", "outcome"),
+    )
+)
+sheets_request_duration = registry.register(
+    HistogramMetric(
+        "bot_sheets_request_duration_seconds",
+        "Duration of Google Sheets batch writes",
+        ("operation", "outcome"),
+    )
+)
+event_loop_lag = registry.register(
+    HistogramMetric(
+        "bot_event_loop_lag_seconds",
+        "How much later than scheduled a periodic event loop wakeup ran",
+    )
+)
+
+
+async def monitor_event_loop_lag(interval: float = 0.1) -> None:
+    while True:
+        start = perf_counter()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, perf_counter() - start - interval))
@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+# Name of the handler or background task the current code runs for
+current_handler: ContextVar[str] = ContextVar("current_handler", default="-")
+
+
+class HandlerContextMiddleware(BaseMiddleware):
+    """
+    Stores the name of the matched handler in current_handler
+    so lower layers (e.g. Mongo instrumentation) can attribute their work to it.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        token = current_handler.set(getattr(callback, "__name__", "-"))
+
+        try:
+            return await handler(event, data)
+        finally:
+            current_handler.reset(token)
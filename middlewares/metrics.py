@@ -0,0 +1,84 @@
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, Update
+
+from metrics import (
+    handler_duration,
+    telegram_request_duration,
+    update_duration,
+    updates_in_flight,
+    updates_total,
+)
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware of dp.update: counts updates by type and outcome
+    ("handled", "unhandled" or "error") and tracks in-flight updates.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else "unknown"
+        outcome = "error"
+
+        updates_in_flight.inc()
+        start = perf_counter()
+
+        try:
+            result = await handler(event, data)
+            outcome = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            update_duration.observe(perf_counter() - start, type=update_type)
+            updates_in_flight.dec()
+            updates_total.inc(type=update_type, outcome=outcome)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware that times the matched handler.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        callback = getattr(data.get("handler"), "callback", None)
+
+        with handler_duration.time(handler=getattr(callback, "__name__", "-")):
+            return await handler(event, data)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Times Bot API requests. Registered after the rate limiter,
+    so every attempt is measured without the time spent waiting for a token.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with telegram_request_duration.time(method=method.__api_method__):
+            return await make_request(bot, method)
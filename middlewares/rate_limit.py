@@ -0,0 +1,114 @@
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from config import (
+    ADMIN_CHAT_ID,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_GROUP_RATE,
+    TELEGRAM_MAX_RETRIES,
+)
+from utils.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+USER_PRIORITY = 0
+ADMIN_PRIORITY = 1
+
+MAX_CHAT_BUCKETS = 10000
+# Telegram tolerates short bursts in a private chat
+PRIVATE_CHAT_BURST = 3
+
+# Methods that don't count towards the message limits
+UNLIMITED_METHODS = {
+    "answerCallbackQuery",
+    "deleteMessage",
+    "sendChatAction",
+    "setMessageReaction",
+}
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Keeps outgoing requests within Telegram's limits: a global bucket for the bot
+    and a bucket per chat (stricter for groups). Replies to users are let through
+    the global bucket before admin chat bookkeeping, and TelegramRetryAfter
+    is handled by waiting and sending the request again.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        group_rate: float = TELEGRAM_GROUP_RATE,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: OrderedDict[Any, TokenBucket] = OrderedDict()
+
+    def _get_chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                # Group limit is per minute, allow a full minute's burst
+                bucket = TokenBucket(self.group_rate / 60, self.group_rate)
+            else:
+                bucket = TokenBucket(
+                    self.chat_rate, max(PRIVATE_CHAT_BURST, self.chat_rate)
+                )
+
+            self._chat_buckets[chat_id] = bucket
+            self._evict_idle_buckets()
+
+        self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _evict_idle_buckets(self) -> None:
+        while len(self._chat_buckets) > MAX_CHAT_BUCKETS:
+            chat_id, bucket = next(iter(self._chat_buckets.items()))
+            if not bucket.is_idle:
+                return
+
+            del self._chat_buckets[chat_id]
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+
+        if chat_id is None or method.__api_method__ in UNLIMITED_METHODS:
+            return await make_request(bot, method)
+
+        priority = ADMIN_PRIORITY if chat_id == ADMIN_CHAT_ID else USER_PRIORITY
+        chat_bucket = self._get_chat_bucket(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire(priority)
+            await self.global_bucket.acquire(priority)
+
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+
+                await asyncio.sleep(e.retry_after)
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+class MongoFSMStorage(BaseStorage):
+    """
+    FSM storage shared by every worker process. State and data of one chat and user
+    are kept in a single document, which expires after FSM_STATE_TTL of inactivity.
+    """
+
+    def __init__(self, collection: Collection) -> None:
+        self.collection = collection
+
+    @staticmethod
+    def _document_id(key: StorageKey) -> str:
+        parts = [key.bot_id, key.chat_id, key.user_id, key.thread_id]
+
+        business_connection_id = getattr(key, "business_connection_id", None)
+        if business_connection_id:
+            parts.append(business_connection_id)
+
+        parts.append(key.destiny)
+
+        return ":".join("" if part is None else str(part) for part in parts)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self.collection.update_one(
+            {"_id": self._document_id(key)},
+            {
+                "$set": {
+                    "state": state.state if isinstance(state, State) else state,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        document = await self.collection.find_one(
+            {"_id": self._document_id(key)}, {"state": 1}
+        )
+
+        return document.get("state") if document else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self.collection.update_one(
+            {"_id": self._document_id(key)},
+            {"$set": {"data": dict(data), "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        document = await self.collection.find_one(
+            {"_id": self._document_id(key)}, {"data": 1}
+        )
+
+        return dict(document.get("data") or {}) if document else {}
+
+    async def update_data(
+        self, key: StorageKey, data: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        if not data:
+            return await self.get_data(key)
+
+        fields = {f"data.{name}": value for name, value in data.items()}
+        fields["updated_at"] = datetime.now(timezone.utc)
+
+        document = await self.collection.find_one_and_update(
+            {"_id": self._document_id(key)},
+            {"$set": fields},
+            projection={"data": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+        return dict(document.get("data") or {})
+
+    async def close(self) -> None:
+        # The Mongo client is shared with the rest of the bot and closed with it
+        pass
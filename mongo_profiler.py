@@ -0,0 +1,173 @@
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+from config import MONGO_SLOW_QUERY_MS
+from metrics import Histogram
+from middlewares.handler_context import current_handler
+from utils.get_winning_plan_stages import get_winning_plan_stages
+
+IGNORED_COMMANDS = {
+    "hello",
+    "ismaster",
+    "isMaster",
+    "ping",
+    "saslStart",
+    "saslContinue",
+    "endSessions",
+    "explain",
+    "buildInfo",
+    "getMore",
+    "killCursors",
+}
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify"}
+
+# Fields added by the driver that explain doesn't accept
+DRIVER_FIELDS = {"$db", "lsid", "$clusterTime", "txnNumber", "$readPreference"}
+
+MAX_SLOW_QUERIES = 100
+
+
+class MongoCommandStats(monitoring.CommandListener):
+    """
+    Records latency histograms of Mongo commands per command, collection and handler,
+    and keeps the most recent slow explainable commands for explaining.
+    Listener callbacks run in Motor's executor threads (which inherit the caller's
+    contextvars, so current_handler is visible there), hence the lock.
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = MONGO_SLOW_QUERY_MS,
+        max_slow_queries: int = MAX_SLOW_QUERIES,
+    ) -> None:
+        self.slow_query_seconds = slow_query_ms / 1000
+
+        self.latencies: Dict[tuple[str, str, str], Histogram] = {}
+        self.failures: Dict[tuple[str, str, str], int] = {}
+        self.slow_queries: deque[Dict[str, Any]] = deque(maxlen=max_slow_queries)
+
+        self._started: Dict[tuple[Any, int], tuple[str, str, str, Optional[dict]]] = {}
+        self._lock = Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in IGNORED_COMMANDS:
+            return
+
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+
+        command = None
+        if event.command_name in EXPLAINABLE_COMMANDS:
+            command = {
+                key: value
+                for key, value in event.command.items()
+                if key not in DRIVER_FIELDS
+            }
+
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                event.database_name,
+                collection,
+                current_handler.get(),
+                command,
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, is_failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, is_failed=True)
+
+    def _finish(self, event: Any, is_failed: bool) -> None:
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+            if started is None:
+                return
+
+            database_name, collection, handler, command = started
+            key = (event.command_name, collection, handler)
+            duration = event.duration_micros / 1_000_000
+
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = self.latencies[key] = Histogram()
+
+            histogram.observe(duration)
+
+            if is_failed:
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+            if command is not None and duration >= self.slow_query_seconds:
+                self.slow_queries.append(
+                    {
+                        "command": event.command_name,
+                        "collection": collection,
+                        "handler": handler,
+                        "duration_ms": duration * 1000,
+                        "at": datetime.now(timezone.utc).isoformat(),
+                        "database": database_name,
+                        "query": command,
+                        "plan": None,
+                    }
+                )
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            commands = [
+                {
+                    "command": command_name,
+                    "collection": collection,
+                    "handler": handler,
+                    "failures": self.failures.get(
+                        (command_name, collection, handler), 0
+                    ),
+                    **histogram.summary(),
+                }
+                for (
+                    command_name,
+                    collection,
+                    handler,
+                ), histogram in self.latencies.items()
+            ]
+            slow_queries = list(self.slow_queries)
+
+        commands.sort(key=lambda stats: stats["sum"], reverse=True)
+
+        return {
+            "commands": commands,
+            "slow_queries": [
+                {key: value for key, value in query.items() if key != "query"}
+                for query in slow_queries
+            ],
+        }
+
+    async def explain_slow_queries(self, client: Any) -> None:
+        """
+        Explains the slow queries that were not explained yet.
+        """
+        with self._lock:
+            pending = [query for query in self.slow_queries if query["plan"] is None]
+
+        for query in pending:
+            try:
+                explain = await client[query["database"]].command(
+                    {"explain": query["query"], "verbosity": "queryPlanner"}
+                )
+            except Exception as e:
+                query["plan"] = {"error": str(e)}
+                continue
+
+            stages = get_winning_plan_stages(explain)
+            query["plan"] = {
+                "stages": sorted(stages),
+                "is_collscan": "COLLSCAN" in stages,
+            }
+
+
+mongo_command_stats = MongoCommandStats()
@@ -0,0 +1,138 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.collection import Collection
+
+from config import QUEUE_RECONCILE_INTERVAL
+from constants.order_statuses import OrderStatus
+from constants.order_types import OrderType
+from utils.get_queue_positions import OPEN_ORDER_STATUSES, get_queue_positions
+from utils.periodic_task import PeriodicTask
+
+
+def normalize_timestamp(timestamp: datetime) -> datetime:
+    """
+    Converts a timestamp to the form it has after a round-trip through Mongo:
+    naive UTC truncated to milliseconds.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+
+class OpenQueue:
+    """
+    Sorted (timestamp, request id) keys of the open requests of one type.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[tuple[datetime, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def reset(self, keys: list[tuple[datetime, str]]) -> None:
+        self._keys = sorted(keys)
+
+    def add(self, timestamp: datetime, request_id: str) -> None:
+        key = (normalize_timestamp(timestamp), request_id)
+        i = bisect_left(self._keys, key)
+
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+
+        insort(self._keys, key, lo=i)
+
+    def remove(self, timestamp: datetime, request_id: str) -> None:
+        key = (normalize_timestamp(timestamp), request_id)
+        i = bisect_left(self._keys, key)
+
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def position(self, timestamp: datetime) -> int:
+        # (timestamp,) sorts before every (timestamp, request_id) key with the same timestamp
+        return bisect_left(self._keys, (normalize_timestamp(timestamp),)) + 1
+
+
+class OpenQueues:
+    """
+    In-process queue positions of open requests for every order type.
+    Loaded from Mongo at startup, kept up to date by the handlers that change statuses
+    and periodically reconciled with Mongo to fix drift, e.g. from other workers.
+    """
+
+    def __init__(self) -> None:
+        self.is_loaded = False
+        self._queues = {order_type: OpenQueue() for order_type in OrderType}
+        self._reconcile_task: Optional[PeriodicTask] = None
+
+    async def load(self, collection: Collection) -> None:
+        keys: dict[str, list[tuple[datetime, str]]] = {
+            order_type.value: [] for order_type in OrderType
+        }
+
+        cursor = collection.find(
+            {"status": {"$in": OPEN_ORDER_STATUSES}},
+            {"problem_type": 1, "timestamp": 1},
+        )
+        async for request in cursor:
+            problem_type_keys = keys.get(request["problem_type"])
+            if problem_type_keys is None:
+                continue
+
+            problem_type_keys.append(
+                (normalize_timestamp(request["timestamp"]), str(request["_id"]))
+            )
+
+        for order_type, queue in self._queues.items():
+            queue.reset(keys[order_type.value])
+
+        self.is_loaded = True
+
+    def start_reconciliation(
+        self, collection: Collection, interval: float = QUEUE_RECONCILE_INTERVAL
+    ) -> None:
+        if self._reconcile_task is None:
+            self._reconcile_task = PeriodicTask(
+                "open_queues_reconcile", lambda: self.load(collection), interval
+            )
+            self._reconcile_task.start()
+
+    async def stop_reconciliation(self) -> None:
+        if self._reconcile_task is not None:
+            await self._reconcile_task.stop()
+            self._reconcile_task = None
+
+    def add(
+        self, problem_type: OrderType, timestamp: datetime, request_id: str
+    ) -> None:
+        self._queues[problem_type].add(timestamp, request_id)
+
+    def set_status(
+        self,
+        problem_type: OrderType,
+        timestamp: datetime,
+        request_id: str,
+        status: OrderStatus,
+    ) -> None:
+        if status.value in OPEN_ORDER_STATUSES:
+            self._queues[problem_type].add(timestamp, request_id)
+        else:
+            self._queues[problem_type].remove(timestamp, request_id)
+
+    async def get_positions(
+        self, collection: Collection, orders: list[tuple[OrderType, datetime]]
+    ) -> list[int]:
+        if not self.is_loaded:
+            return await get_queue_positions(collection, orders)
+
+        return [
+            self._queues[problem_type].position(timestamp)
+            for problem_type, timestamp in orders
+        ]
+
+
+open_queues = OpenQueues()
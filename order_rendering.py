@@ -0,0 +1,71 @@
+from typing import Optional
+
+from constants.dorms import DORM_RESPONSIBLES
+from constants.order_statuses import ORDER_STATUS_NAMES, OrderStatus
+from constants.order_types import ORDER_TYPE_NAMES, OrderType
+from schemas.request import Request
+from utils.get_problem_types_keyboard import get_problem_types_keyboard
+from utils.get_request_digits_id import get_request_digits_id
+
+ORDER_CARD_TEMPLATE = (
+    "{title} #{digits_id}\n"
+    "ПІБ: {name}\n"
+    "{telegram_line}"
+    "Телефон: {phone}\n"
+    "Гуртожиток: {dorm}\n"
+    "Тип: {order_type}\n"
+    "{details_line}"
+    "Статус: {status}{status_label}\n\n"
+    "#гурт{dorm}{dorm_responsible}"
+)
+
+# Bound once, so rendering a card is a single format call
+format_order_card = ORDER_CARD_TEMPLATE.format
+format_telegram_line = "Телеграм: {}\n".format
+format_details_line = "Опис: {}\n".format
+format_status_label = " [{}]".format
+format_dorm_responsible = ", {}".format
+
+PROBLEM_TYPE_KEYBOARD = get_problem_types_keyboard()
+
+
+def get_telegram_label(request: Request) -> str:
+    username = request.get("username")
+    if username:
+        return f"@{username}"
+
+    # Requests created before usernames and full names were saved only have user_id
+    return request.get("full_name") or str(request.get("user_id"))
+
+
+def render_order_card(
+    request: Request,
+    status: OrderStatus,
+    is_new: bool = False,
+    show_telegram: bool = True,
+    show_details: bool = True,
+    user_label: Optional[str] = None,
+) -> str:
+    """
+    Text of the request card posted to the admin chat.
+    """
+    dorm_responsible = DORM_RESPONSIBLES.get(request["dorm"])
+    details = request.get("details")
+
+    return format_order_card(
+        title="Нова заявка" if is_new else "Заявка",
+        digits_id=get_request_digits_id(request),
+        name=request["name"],
+        telegram_line=(
+            format_telegram_line(get_telegram_label(request)) if show_telegram else ""
+        ),
+        phone=request["phone"],
+        dorm=request["dorm"],
+        order_type=ORDER_TYPE_NAMES[OrderType[request["problem_type"]]],
+        details_line=format_details_line(details) if show_details and details else "",
+        status=ORDER_STATUS_NAMES[status],
+        status_label=format_status_label(user_label) if user_label else "",
+        dorm_responsible=(
+            format_dorm_responsible(dorm_responsible) if dorm_responsible else ""
+        ),
+    )
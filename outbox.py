@@ -0,0 +1,448 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from aiogram import Bot
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from config import (
+    OUTBOX_BACKOFF_BASE,
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_CONCURRENCY,
+    OUTBOX_LEASE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_INTERVAL,
+)
+from constants.outbox_job_statuses import OutboxJobStatus
+from database import db
+from metrics import HistogramMetric, registry
+from middlewares.handler_context import current_handler
+from schemas.outbox_job import PendingOutboxJob
+from utils.periodic_task import PeriodicTask
+
+outbox_step_duration = registry.register(
+    HistogramMetric(
+        "bot_outbox_step_duration_seconds",
+        "Duration of executed outbox job steps",
+        ("job_type", "step", "outcome"),
+    )
+)
+outbox_job_duration = registry.register(
+    HistogramMetric(
+        "bot_outbox_job_duration_seconds",
+        "Duration of outbox job attempts",
+        ("job_type", "outcome"),
+    )
+)
+
+StepFunc = Callable[..., Awaitable[Any]]
+
+
+def get_job_key(job_type: str, group: str, key: str = "") -> str:
+    return f"{job_type}:{group}:{key}" if key else f"{job_type}:{group}"
+
+
+class OutboxJob:
+    """
+    Pending side effect loaded from the outbox collection.
+    Results of completed steps are saved on the job, so a retried job
+    skips the steps that already succeeded.
+    """
+
+    def __init__(self, collection: Collection, document: Dict[str, Any]) -> None:
+        self.collection = collection
+        self.id = document["_id"]
+        self.type: str = document["type"]
+        self.group: str = document["group"]
+        self.payload: Dict[str, Any] = document["payload"]
+        self.attempts: int = document["attempts"]
+        self.steps: Dict[str, Any] = document.get("steps") or {}
+
+    async def step(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        if name in self.steps:
+            return self.steps[name]
+
+        with outbox_step_duration.time(job_type=self.type, step=name):
+            result = await func()
+
+        await self.collection.update_one(
+            {"_id": self.id}, {"$set": {f"steps.{name}": result}}
+        )
+        self.steps[name] = result
+
+        return result
+
+    async def run_steps(
+        self, graph: Dict[str, tuple[StepFunc, tuple[str, ...]]]
+    ) -> Dict[str, Any]:
+        """
+        Runs steps as a dependency graph of name -> (func, names of its dependencies).
+        Every step starts as soon as its dependencies are done and gets their results
+        as arguments, so independent steps run concurrently. Dependencies must be
+        declared before the steps that need them. Steps that don't depend on
+        a failed one still finish, so a retry skips them.
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(name: str) -> Any:
+            func, dependencies = graph[name]
+            results = [await tasks[dependency] for dependency in dependencies]
+
+            return await self.step(name, lambda: func(*results))
+
+        for name in graph:
+            tasks[name] = asyncio.create_task(run_step(name))
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return dict(zip(tasks, results))
+
+
+JobHandler = Callable[[OutboxJob, Bot], Awaitable[None]]
+FailureHandler = Callable[[OutboxJob, Bot, Exception], Awaitable[None]]
+
+
+class Outbox:
+    """
+    Side effects of state changes (Telegram messages, Sheets rows) written to Mongo
+    as jobs and executed in the background with retries and exponential backoff.
+    Jobs of the same group (e.g. one request) are not run concurrently by one process.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        relayed_collections: Sequence[Collection] = (),
+        concurrency: int = OUTBOX_CONCURRENCY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ) -> None:
+        self.collection = collection
+        self.relayed_collections = relayed_collections
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+        self._handlers: Dict[str, tuple[JobHandler, Optional[FailureHandler]]] = {}
+        self._bot: Optional[Bot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._relay_task: Optional[PeriodicTask] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set[asyncio.Task] = set()
+        self._running_groups: set[str] = set()
+
+    def register(
+        self, job_type: str, on_failure: Optional[FailureHandler] = None
+    ) -> Callable[[JobHandler], JobHandler]:
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[job_type] = (handler, on_failure)
+            return handler
+
+        return decorator
+
+    async def enqueue(
+        self, job_type: str, payload: Dict[str, Any], key: str, group: str
+    ) -> None:
+        """
+        Saves a pending job. A job with an already used idempotency key is ignored.
+        """
+        now = datetime.now(timezone.utc)
+
+        try:
+            await self.collection.insert_one(
+                {
+                    "key": key,
+                    "group": group,
+                    "type": job_type,
+                    "payload": payload,
+                    "status": OutboxJobStatus.PENDING.value,
+                    "attempts": 0,
+                    "steps": {},
+                    "created_at": now,
+                    "next_attempt_at": now,
+                    "locked_until": now,
+                }
+            )
+        except DuplicateKeyError:
+            return
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def pending_job(
+        job_type: str, payload: Dict[str, Any], key: str = ""
+    ) -> PendingOutboxJob:
+        """
+        Job to be saved in the pending_jobs field of the document whose change it
+        follows, in the same write as the change, so neither is saved without the other.
+        relay moves it to the outbox with the document's _id as its group.
+        The key only has to be unique among the jobs of its type for the document.
+        """
+        return {
+            "type": job_type,
+            "key": key,
+            "payload": payload,
+            "created_at": datetime.now(timezone.utc),
+        }
+
+    async def relay(
+        self, collection: Collection, document_id: Optional[ObjectId] = None
+    ) -> None:
+        """
+        Moves pending jobs saved in documents of the collection (or only the given one)
+        to the outbox. Handlers relay their document right after writing it,
+        the periodic relay picks up jobs left behind by a crash in between.
+        """
+        query: Dict[str, Any] = {"pending_jobs.key": {"$exists": True}}
+        if document_id is not None:
+            query["_id"] = document_id
+
+        async for document in collection.find(query, {"pending_jobs": 1}):
+            try:
+                await self._relay_document(collection, document)
+            except Exception as e:
+                print(f"Could not relay outbox jobs of {document['_id']}: {e!r}")
+
+    async def is_pending(self, job_type: str, group: str, key: str = "") -> bool:
+        """
+        Whether the job relayed with these type, group and key still has to run.
+        """
+        job = await self.collection.find_one(
+            {
+                "key": get_job_key(job_type, group, key),
+                "status": OutboxJobStatus.PENDING.value,
+            },
+            {"_id": 1},
+        )
+
+        return job is not None
+
+    async def _relay_document(
+        self, collection: Collection, document: Dict[str, Any]
+    ) -> None:
+        group = str(document["_id"])
+        jobs: list[PendingOutboxJob] = document["pending_jobs"]
+
+        # Enqueued in the order they were saved, the keys make a repeated relay a no-op
+        for job in jobs:
+            await self.enqueue(
+                job["type"],
+                job["payload"],
+                get_job_key(job["type"], group, job["key"]),
+                group,
+            )
+
+        relayed = [[job["type"], job["key"]] for job in jobs]
+        remaining = {
+            "$filter": {
+                "input": "$pending_jobs",
+                "cond": {
+                    "$not": {
+                        "$in": [["$$this.type", "$$this.key"], {"$literal": relayed}]
+                    }
+                },
+            }
+        }
+
+        # Jobs added meanwhile are kept, the field is removed once it is empty.
+        # A concurrent relay may have removed it already
+        await collection.update_one(
+            {"_id": document["_id"], "pending_jobs.key": {"$exists": True}},
+            [
+                {
+                    "$set": {
+                        "pending_jobs": {
+                            "$cond": [
+                                {"$eq": [{"$size": remaining}, 0]},
+                                "$$REMOVE",
+                                remaining,
+                            ]
+                        }
+                    }
+                }
+            ],
+        )
+
+    def start(self, bot: Bot) -> None:
+        if self._task is None:
+            self._bot = bot
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run())
+
+            self._relay_task = PeriodicTask(
+                "outbox_relay", self._relay_all, OUTBOX_POLL_INTERVAL, run_at_start=True
+            )
+            self._relay_task.start()
+
+    async def _relay_all(self) -> None:
+        for collection in self.relayed_collections:
+            await self.relay(collection)
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Stops claiming jobs and waits for the running ones.
+        Jobs that don't finish in time are retried after their lease expires.
+        """
+        if self._task is None:
+            return
+
+        await self._relay_task.stop()
+        self._relay_task = None
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+        if self._running:
+            await asyncio.wait(self._running, timeout=timeout)
+
+    async def _run(self) -> None:
+        while True:
+            await self._slots.acquire()
+
+            self._wakeup.clear()
+            try:
+                document = await self._claim()
+            except Exception as e:
+                print(e)
+                document = None
+
+            if document is None:
+                self._slots.release()
+
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+                continue
+
+            group = document["group"]
+            self._running_groups.add(group)
+
+            task = asyncio.create_task(self._execute(document))
+            self._running.add(task)
+            task.add_done_callback(lambda t, g=group: self._on_done(t, g))
+
+    def _on_done(self, task: asyncio.Task, group: str) -> None:
+        self._running.discard(task)
+        self._running_groups.discard(group)
+        self._slots.release()
+        self._wakeup.set()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+
+        return await self.collection.find_one_and_update(
+            {
+                "status": OutboxJobStatus.PENDING.value,
+                "next_attempt_at": {"$lte": now},
+                "locked_until": {"$lte": now},
+                "group": {"$nin": list(self._running_groups)},
+            },
+            {
+                "$set": {"locked_until": now + timedelta(seconds=OUTBOX_LEASE)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _execute(self, document: Dict[str, Any]) -> None:
+        job = OutboxJob(self.collection, document)
+        current_handler.set(f"outbox:{job.type}")
+
+        handler, on_failure = self._handlers.get(job.type, (None, None))
+
+        start = perf_counter()
+
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown outbox job type: {job.type}")
+
+            await handler(job, self._bot)
+        except Exception as e:
+            outbox_job_duration.observe(
+                perf_counter() - start, job_type=job.type, outcome="error"
+            )
+
+            try:
+                await self._fail(job, e, on_failure)
+            except Exception as fail_error:
+                print(fail_error)
+
+            return
+
+        outbox_job_duration.observe(
+            perf_counter() - start, job_type=job.type, outcome="ok"
+        )
+
+        try:
+            await self.collection.update_one(
+                {"_id": job.id},
+                {
+                    "$set": {
+                        "status": OutboxJobStatus.DONE.value,
+                        "done_at": datetime.now(timezone.utc),
+                    }
+                },
+            )
+        except Exception as e:
+            print(e)
+
+    async def _fail(
+        self, job: OutboxJob, error: Exception, on_failure: Optional[FailureHandler]
+    ) -> None:
+        print(f"Outbox job {job.type} {job.id} failed: {error!r}")
+
+        now = datetime.now(timezone.utc)
+
+        if job.attempts >= self.max_attempts:
+            await self.collection.update_one(
+                {"_id": job.id},
+                {
+                    "$set": {
+                        "status": OutboxJobStatus.FAILED.value,
+                        "last_error": repr(error),
+                    }
+                },
+            )
+
+            if on_failure is not None:
+                try:
+                    await on_failure(job, self._bot, error)
+                except Exception as e:
+                    print(e)
+
+            return
+
+        backoff = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (job.attempts - 1))
+
+        await self.collection.update_one(
+            {"_id": job.id},
+            {
+                "$set": {
+                    "next_attempt_at": now + timedelta(seconds=backoff),
+                    "locked_until": now,
+                    "last_error": repr(error),
+                }
+            },
+        )
+
+
+outbox = Outbox(db.outbox, relayed_collections=[db.requests])
@@ -0,0 +1,272 @@
+import re
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from bson import ObjectId
+
+from config import ADMIN_CHAT_ID, AFTER_HOURS_PHONE
+from constants.order_statuses import ORDER_STATUS_NAMES, OrderStatus
+from constants.order_types import OrderType
+from database import db
+from feedback_service import get_admin_message_id, store_message_mapping
+from order_rendering import render_order_card
+from outbox import OutboxJob, outbox
+from sheets_sync_worker import sheets_sync_worker
+from utils.get_request_digits_id import get_request_digits_id
+from utils.get_status_keyboard import get_status_keyboard
+from utils.is_within_work_hours import is_within_work_hours
+
+REQUEST_CREATED = "request_created"
+STATUS_CHANGED = "status_changed"
+REQUEST_CANCELLED = "request_cancelled"
+
+
+async def notify_sheet_error(job: OutboxJob, bot: Bot, _: Exception) -> None:
+    if "admin_message" not in job.steps or "sheet" in job.steps:
+        return
+
+    await bot.send_message(
+        ADMIN_CHAT_ID,
+        "Не вдалось додати запис в таблицю",
+        message_thread_id=job.payload["thread_id"],
+    )
+
+
+@outbox.register(REQUEST_CREATED, on_failure=notify_sheet_error)
+async def publish_created_request(job: OutboxJob, bot: Bot) -> None:
+    request = await db.requests.find_one({"_id": ObjectId(job.group)})
+    if request is None:
+        return
+
+    request_id = str(request["_id"])
+    request_digits_id = get_request_digits_id(request)
+    thread_id = job.payload["thread_id"]
+
+    async def forward_details() -> Optional[int]:
+        if not job.payload["has_media"]:
+            return None
+
+        try:
+            forwarded_msg = await bot.forward_message(
+                ADMIN_CHAT_ID,
+                job.payload["chat_id"],
+                job.payload["message_id"],
+                message_thread_id=thread_id,
+            )
+        except TelegramBadRequest:
+            # The user deleted the message before it was forwarded
+            return None
+
+        await db.requests.update_one(
+            {"_id": request["_id"]},
+            {"$set": {"forwarded_message_id": forwarded_msg.message_id}},
+        )
+
+        return forwarded_msg.message_id
+
+    async def send_user_message() -> int:
+        if is_within_work_hours(request["timestamp"]):
+            info_msg = "Очікуйте на відповідь"
+        else:
+            info_msg = "Зараз неробочий час, тому вона буде розглянута вранці"
+
+            if AFTER_HOURS_PHONE:
+                info_msg += f". У разі аварійної ситуації телефонуйте за номером: {AFTER_HOURS_PHONE}"
+
+        user_message = await bot.send_message(
+            job.payload["chat_id"],
+            f"Заявка #{request_digits_id} відправлена.\n"
+            f"{info_msg}. Якщо бажаєте додати більше інформації, відправте реплай на це повідомлення.\n"
+            f"Позиція в черзі: {job.payload['queue_position']}",
+        )
+
+        return user_message.message_id
+
+    async def send_admin_message(forwarded_message_id: Optional[int]) -> int:
+        # A retried job may post the card after the user has already cancelled it
+        status = OrderStatus(request["status"])
+        is_cancelled = status == OrderStatus.CANCELLED
+
+        msg_text = render_order_card(
+            request,
+            status,
+            is_new=True,
+            show_telegram=not is_cancelled,
+            show_details=forwarded_message_id is None,
+        )
+
+        admin_message = await bot.send_message(
+            ADMIN_CHAT_ID,
+            msg_text,
+            message_thread_id=thread_id,
+            reply_markup=(
+                None if is_cancelled else get_status_keyboard(status, request_id)
+            ),
+            parse_mode=None,
+        )
+
+        return admin_message.message_id
+
+    async def store_mapping(
+        forwarded_message_id: Optional[int],
+        user_message_id: int,
+        admin_message_id: int,
+    ) -> None:
+        await store_message_mapping(
+            db,
+            request["user_id"],
+            user_message_id,
+            admin_message_id,
+            forwarded_message_id,
+            True if forwarded_message_id else None,
+            wait_for_write=True,
+        )
+
+    async def add_sheet_row(admin_message_id: int) -> None:
+        admin_chat_id_str = re.sub(r"^-100", "", str(ADMIN_CHAT_ID))
+        telegram_url = (
+            f"https://t.me/c/{admin_chat_id_str}/{thread_id}/{admin_message_id}"
+        )
+
+        await sheets_sync_worker.add_order(request_digits_id, telegram_url, request)
+
+    # The forwarded details have to be posted before the card that refers to them
+    await job.run_steps(
+        {
+            "forward": (forward_details, ()),
+            "user_message": (send_user_message, ()),
+            "admin_message": (send_admin_message, ("forward",)),
+            "mapping": (
+                store_mapping,
+                ("forward", "user_message", "admin_message"),
+            ),
+            "sheet": (add_sheet_row, ("admin_message",)),
+        }
+    )
+
+
+@outbox.register(STATUS_CHANGED)
+async def publish_status_change(job: OutboxJob, bot: Bot) -> None:
+    request = await db.requests.find_one({"_id": ObjectId(job.group)})
+    if request is None:
+        return
+
+    request_id = str(request["_id"])
+    request_digits_id = get_request_digits_id(request)
+    order_type = OrderType[request["problem_type"]]
+    status = OrderStatus(job.payload["status"])
+
+    async def notify_user() -> Optional[int]:
+        try:
+            user_message = await bot.send_message(
+                request["user_id"],
+                f"Статус заявки #{request_digits_id} оновлено: {ORDER_STATUS_NAMES[status]}",
+            )
+        except (TelegramBadRequest, TelegramForbiddenError):
+            # The user blocked the bot or deleted the chat
+            return None
+
+        return user_message.message_id
+
+    async def edit_admin_message() -> None:
+        # A later status change has already been applied and will render the card itself
+        if request["status"] != status.value:
+            return
+
+        msg_text = render_order_card(
+            request, status, user_label=job.payload["user_label"]
+        )
+
+        try:
+            await bot.edit_message_text(
+                msg_text,
+                chat_id=job.payload["admin_chat_id"],
+                message_id=job.payload["admin_message_id"],
+                reply_markup=get_status_keyboard(status, request_id),
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in e.message:
+                raise
+
+    async def store_mapping(user_message_id: Optional[int]) -> None:
+        if user_message_id is None:
+            return
+
+        await store_message_mapping(
+            db,
+            request["user_id"],
+            user_message_id,
+            job.payload["admin_message_id"],
+            wait_for_write=True,
+        )
+
+    async def update_sheet() -> None:
+        await sheets_sync_worker.update_status(
+            request_digits_id,
+            OrderStatus(request["status"]),
+            order_type,
+            request["edit_timestamp"],
+        )
+
+    await job.run_steps(
+        {
+            "user_message": (notify_user, ()),
+            "admin_message": (edit_admin_message, ()),
+            "mapping": (store_mapping, ("user_message",)),
+            "sheet": (update_sheet, ()),
+        }
+    )
+
+
+@outbox.register(REQUEST_CANCELLED)
+async def publish_cancellation(job: OutboxJob, bot: Bot) -> None:
+    request = await db.requests.find_one({"_id": ObjectId(job.group)})
+    if request is None:
+        return
+
+    request_digits_id = get_request_digits_id(request)
+    order_type = OrderType[request["problem_type"]]
+
+    async def edit_admin_message() -> None:
+        if request["status"] != OrderStatus.CANCELLED.value:
+            return
+
+        admin_message_id = await get_admin_message_id(
+            db, request["user_id"], job.payload["user_message_id"]
+        )
+        if not admin_message_id:
+            # The card is not posted or mapped yet, retry until the creation job is done
+            if await outbox.is_pending(REQUEST_CREATED, job.group):
+                raise RuntimeError(f"Request {job.group} is not published yet")
+
+            return
+
+        msg_text = render_order_card(
+            request, OrderStatus.CANCELLED, show_telegram=False
+        )
+
+        try:
+            await bot.edit_message_text(
+                text=msg_text,
+                chat_id=ADMIN_CHAT_ID,
+                message_id=admin_message_id,
+            )
+        except TelegramBadRequest:
+            # The admin message was deleted or is already up to date
+            pass
+
+    async def update_sheet() -> None:
+        await sheets_sync_worker.update_status(
+            request_digits_id,
+            OrderStatus(request["status"]),
+            order_type,
+            request["edit_timestamp"],
+        )
+
+    await job.run_steps(
+        {
+            "admin_message": (edit_admin_message, ()),
+            "sheet": (update_sheet, ()),
+        }
+    )
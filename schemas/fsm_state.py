@@ -0,0 +1,9 @@
+from datetime import datetime
+from typing import Any, Optional, TypedDict
+
+
+class FSMState(TypedDict):
+    _id: str
+    state: Optional[str]
+    data: dict[str, Any]
+    updated_at: datetime
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Any, Optional, TypedDict
+
+
+class OutboxJob(TypedDict):
+    key: str
+    group: str
+    type: str
+    payload: dict[str, Any]
+    status: str
+    attempts: int
+    steps: dict[str, Any]
+    created_at: datetime
+    next_attempt_at: datetime
+    locked_until: datetime
+    done_at: Optional[datetime]
+    last_error: Optional[str]
+
+
+class PendingOutboxJob(TypedDict):
+    type: str
+    key: str
+    payload: dict[str, Any]
+    created_at: datetime
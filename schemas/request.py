@@ -1,8 +1,12 @@
 from datetime import datetime
 from typing import Optional, TypedDict
 
+from schemas.outbox_job import PendingOutboxJob
+
 
 class Request(TypedDict):
+    digits_id: str
+    digits_id_collision: Optional[bool]
     name: str
     phone: str
     dorm: str
@@ -10,9 +14,12 @@ class Request(TypedDict):
     details: Optional[str]
     forwarded_message_id: Optional[int]
     status: str
+    previous_status: Optional[str]
     timestamp: datetime
     edit_timestamp: datetime
     user_id: int
     username: Optional[str]
     full_name: Optional[str]
     set_status_user_id: int
+    form_id: Optional[str]
+    pending_jobs: Optional[list[PendingOutboxJob]]
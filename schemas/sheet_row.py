@@ -0,0 +1,7 @@
+from typing import TypedDict
+
+
+class SheetRow(TypedDict):
+    sheet_name: str
+    request_id: str
+    row: int
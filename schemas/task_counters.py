@@ -0,0 +1,8 @@
+from datetime import datetime
+from typing import TypedDict
+
+
+class TaskCounters(TypedDict):
+    _id: str
+    counts: dict[str, int]
+    recounted_at: datetime
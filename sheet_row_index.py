@@ -0,0 +1,57 @@
+from typing import Dict, Iterable
+
+from pymongo import DeleteMany, UpdateOne
+from pymongo.collection import Collection
+
+
+class SheetRowIndex:
+    """
+    Persistent mapping of request digits ID to its row number in a worksheet,
+    so status updates do not have to search the ID column.
+    """
+
+    def __init__(self, collection: Collection) -> None:
+        self.collection = collection
+
+    async def get_rows(
+        self, request_ids: Dict[str, Iterable[str]]
+    ) -> Dict[str, Dict[str, int]]:
+        conditions = [
+            {"sheet_name": sheet_name, "request_id": {"$in": list(ids)}}
+            for sheet_name, ids in request_ids.items()
+        ]
+        rows: Dict[str, Dict[str, int]] = {}
+
+        if not conditions:
+            return rows
+
+        async for doc in self.collection.find({"$or": conditions}):
+            rows.setdefault(doc["sheet_name"], {})[doc["request_id"]] = doc["row"]
+
+        return rows
+
+    async def set_rows(self, rows: Dict[str, Dict[str, int]]) -> None:
+        operations = [
+            UpdateOne(
+                {"sheet_name": sheet_name, "request_id": request_id},
+                {"$set": {"row": row}},
+                upsert=True,
+            )
+            for sheet_name, sheet_rows in rows.items()
+            for request_id, row in sheet_rows.items()
+        ]
+
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def replace_sheet(self, sheet_name: str, rows: Dict[str, int]) -> None:
+        operations = [DeleteMany({"sheet_name": sheet_name})] + [
+            UpdateOne(
+                {"sheet_name": sheet_name, "request_id": request_id},
+                {"$set": {"row": row}},
+                upsert=True,
+            )
+            for request_id, row in rows.items()
+        ]
+
+        await self.collection.bulk_write(operations)
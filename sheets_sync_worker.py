@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import SHEETS_FLUSH_INTERVAL
+from constants.order_statuses import OrderStatus
+from constants.order_types import OrderType
+from database import db
+from google_sheets_service import SheetsWriteBatch
+from metrics import sheets_request_duration
+from middlewares.handler_context import current_handler
+from sheet_row_index import SheetRowIndex
+
+
+class SheetsSyncWorker:
+    """
+    Runs Google Sheets mutations in the background so handlers never wait on gspread.
+    Changes submitted during one flush window are coalesced into a single SheetsWriteBatch,
+    which is written from a worker thread. Windows are flushed in submission order.
+    Every submitted change returns a future that resolves once its window is written.
+    """
+
+    def __init__(
+        self, row_index: SheetRowIndex, flush_interval: float = SHEETS_FLUSH_INTERVAL
+    ) -> None:
+        self.row_index = row_index
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Flushes every change that is already queued and stops the worker.
+        """
+        if self._task is None:
+            return
+
+        self._stopping.set()
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def add_order(
+        self,
+        order_id: str,
+        telegram_url: str,
+        order: Dict[str, Any],
+    ) -> asyncio.Future:
+        return self._submit("add_order", order_id, (order_id, telegram_url, order))
+
+    def update_status(
+        self,
+        request_id: str,
+        new_status: OrderStatus,
+        problem_type: OrderType,
+        edit_timestamp: datetime,
+    ) -> asyncio.Future:
+        return self._submit(
+            "update_status",
+            request_id,
+            (request_id, new_status, problem_type, edit_timestamp),
+        )
+
+    def _submit(self, method: str, request_id: str, args: tuple) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((method, request_id, args, future))
+
+        return future
+
+    async def _run(self) -> None:
+        current_handler.set("sheets_sync")
+
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                return
+
+            if not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+            jobs = [job]
+            is_stopped = False
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if job is None:
+                    is_stopped = True
+                    break
+
+                jobs.append(job)
+
+            await self._flush(jobs)
+
+            if is_stopped:
+                return
+
+    async def _flush(self, jobs: list) -> None:
+        batch = SheetsWriteBatch()
+        for method, _, args, _ in jobs:
+            getattr(batch, method)(*args)
+
+        try:
+            errors = await self._write(batch)
+        except Exception as e:
+            errors = {request_id: e for _, request_id, _, _ in jobs}
+
+        for _, request_id, _, future in jobs:
+            if future.done():
+                continue
+
+            error = errors.get(request_id)
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def _write(self, batch: SheetsWriteBatch) -> Dict[str, Exception]:
+        errors: Dict[str, Exception] = {}
+
+        if batch.appends:
+            with sheets_request_duration.time(operation="append"):
+                errors, appended_rows = await asyncio.to_thread(batch.write_appends)
+
+            try:
+                await self.row_index.set_rows(appended_rows)
+            except Exception as e:
+                print(e)
+
+        if not batch.status_updates:
+            return errors
+
+        try:
+            known_rows = await self.row_index.get_rows(batch.status_updates)
+        except Exception as e:
+            print(e)
+            known_rows = {}
+
+        with sheets_request_duration.time(operation="status_update"):
+            update_errors, rebuilt_rows = await asyncio.to_thread(
+                batch.write_status_updates, known_rows
+            )
+        errors.update(update_errors)
+
+        for sheet_name, rows in rebuilt_rows.items():
+            try:
+                await self.row_index.replace_sheet(sheet_name, rows)
+            except Exception as e:
+                print(e)
+
+        return errors
+
+
+sheets_sync_worker = SheetsSyncWorker(SheetRowIndex(db.sheet_rows))
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Sequence
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+from config import TIMEZONE_OFFSET
+from constants.order_statuses import OrderStatus
+from schemas.outbox_job import PendingOutboxJob
+from schemas.request import Request
+
+
+class StatusTransitionConflict(Exception):
+    """
+    The request doesn't exist (current_status is None) or its current status
+    doesn't allow the transition, e.g. because it was just changed by someone else.
+    """
+
+    def __init__(self, current_status: Optional[OrderStatus]) -> None:
+        super().__init__(current_status)
+        self.current_status = current_status
+
+
+async def transition_status(
+    collection: Collection[Request],
+    query: dict[str, Any],
+    new_status: OrderStatus,
+    user_id: int,
+    allowed_transitions: dict[OrderStatus, set[OrderStatus]],
+    pending_jobs: Sequence[PendingOutboxJob] = (),
+    expected_status: Optional[OrderStatus] = None,
+) -> Request:
+    """
+    Sets the status of the request matching the query with one conditional
+    find_one_and_update, which matches only if the current status may change
+    to new_status and, if given, is still expected_status (the status the caller
+    saw, so of two concurrent changes only the first one applies).
+    The pending outbox jobs are saved in the same update.
+    Returns the updated request, with the status it had before in previous_status.
+    """
+    from_statuses = [
+        status.value
+        for status, to_statuses in allowed_transitions.items()
+        if new_status in to_statuses
+        and (expected_status is None or status == expected_status)
+    ]
+    edit_timestamp = datetime.now(timezone.utc) + timedelta(hours=TIMEZONE_OFFSET)
+
+    changes: dict[str, Any] = {
+        "previous_status": "$status",
+        "status": new_status.value,
+        "set_status_user_id": user_id,
+        "edit_timestamp": edit_timestamp,
+    }
+    if pending_jobs:
+        changes["pending_jobs"] = {
+            "$concatArrays": [
+                {"$ifNull": ["$pending_jobs", []]},
+                {"$literal": list(pending_jobs)},
+            ]
+        }
+
+    request = await collection.find_one_and_update(
+        {**query, "status": {"$in": from_statuses}},
+        [{"$set": changes}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if request is not None:
+        return request
+
+    # Only the failed transitions pay for a second round-trip to tell why
+    current = await collection.find_one(query, {"status": 1})
+    raise StatusTransitionConflict(
+        OrderStatus(current["status"]) if current is not None else None
+    )
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.collection import Collection
+
+from config import TASKS_RECOUNT_INTERVAL
+from constants.order_statuses import OrderStatus
+from constants.order_types import OrderType
+from database import db
+from schemas.task_counters import TaskCounters as TaskCountersDocument
+from utils.periodic_task import PeriodicTask
+
+IN_PROGRESS_ID = "in_progress"
+
+
+class TaskCounters:
+    """
+    Number of in-progress requests of every type, kept in one counters document.
+    Status changes adjust it with $inc and a periodic recount fixes drift,
+    e.g. from a status change that crashed between its two writes.
+    """
+
+    def __init__(self, counters: Collection, requests: Collection) -> None:
+        self.counters: Collection[TaskCountersDocument] = counters
+        self.requests = requests
+        self._recount_task: Optional[PeriodicTask] = None
+
+    async def get(self) -> dict[OrderType, int]:
+        document = await self.counters.find_one({"_id": IN_PROGRESS_ID})
+        if document is None:
+            return await self.recount()
+
+        counts = document.get("counts", {})
+
+        return {
+            order_type: max(0, counts.get(order_type.value, 0))
+            for order_type in OrderType
+        }
+
+    async def apply_transition(
+        self, order_type: OrderType, old_status: str, new_status: str
+    ) -> None:
+        delta = (new_status == OrderStatus.IN_PROGRESS.value) - (
+            old_status == OrderStatus.IN_PROGRESS.value
+        )
+        if delta == 0:
+            return
+
+        await self.counters.update_one(
+            {"_id": IN_PROGRESS_ID},
+            {"$inc": {f"counts.{order_type.value}": delta}},
+            upsert=True,
+        )
+
+    async def recount(self) -> dict[OrderType, int]:
+        counts = {order_type: 0 for order_type in OrderType}
+
+        pipeline = [
+            {"$match": {"status": OrderStatus.IN_PROGRESS.value}},
+            {"$group": {"_id": "$problem_type", "count": {"$sum": 1}}},
+        ]
+        async for doc in self.requests.aggregate(pipeline):
+            try:
+                counts[OrderType[doc["_id"]]] = doc["count"]
+            except KeyError:
+                continue
+
+        await self.counters.update_one(
+            {"_id": IN_PROGRESS_ID},
+            {
+                "$set": {
+                    "counts": {
+                        order_type.value: count for order_type, count in counts.items()
+                    },
+                    "recounted_at": datetime.now(timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+
+        return counts
+
+    def start_recount(self, interval: float = TASKS_RECOUNT_INTERVAL) -> None:
+        if self._recount_task is None:
+            self._recount_task = PeriodicTask(
+                "task_counters_recount", self.recount, interval
+            )
+            self._recount_task.start()
+
+    async def stop_recount(self) -> None:
+        if self._recount_task is not None:
+            await self._recount_task.stop()
+            self._recount_task = None
+
+
+task_counters = TaskCounters(db.counters, db.requests)
@@ -0,0 +1,4 @@
+import os
+
+# config reads the environment on import and requires the admin chat
+os.environ.setdefault("ADMIN_CHAT_ID", "-1001234567890")
@@ -0,0 +1,54 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import feedback_service
+from feedback_cache import FeedbackMappingCache
+from feedback_service import get_user_message_id, store_message_mapping
+from feedback_write_buffer import FeedbackWriteBuffer
+
+USER_ID = 1
+CARD_ID = 500
+OTHER_CARD_ID = 501
+
+
+def test_evicted_card_mapping_is_not_replaced_by_a_later_one(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(feedback_service, "feedback_cache", FeedbackMappingCache(1, 60))
+    monkeypatch.setattr(
+        feedback_service, "feedback_write_buffer", FeedbackWriteBuffer(db.feedback)
+    )
+
+    async def run():
+        # The request card is mapped to the message that created the request
+        await store_message_mapping(db, USER_ID, 100, CARD_ID)
+        await store_message_mapping(db, USER_ID, 200, OTHER_CARD_ID)
+        assert await get_user_message_id(db, CARD_ID) == (USER_ID, 100)
+
+        # Evicts the card from the admin -> user direction
+        assert await get_user_message_id(db, OTHER_CARD_ID) == (USER_ID, 200)
+
+        # A status notification is mapped to the same card
+        await store_message_mapping(db, USER_ID, 101, CARD_ID)
+
+        return await get_user_message_id(db, CARD_ID)
+
+    assert asyncio.run(run()) == (USER_ID, 100)
+
+
+def test_card_lookup_prefers_the_earliest_saved_mapping(monkeypatch):
+    db = AsyncMongoMockClient()["test"]
+    monkeypatch.setattr(
+        feedback_service, "feedback_cache", FeedbackMappingCache(10, 60)
+    )
+    monkeypatch.setattr(
+        feedback_service, "feedback_write_buffer", FeedbackWriteBuffer(db.feedback)
+    )
+
+    async def run():
+        await store_message_mapping(db, USER_ID, 100, CARD_ID)
+        await store_message_mapping(db, USER_ID, 101, CARD_ID)
+
+        return await get_user_message_id(db, CARD_ID)
+
+    assert asyncio.run(run()) == (USER_ID, 100)
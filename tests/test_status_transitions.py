@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from constants.order_statuses import ADMIN_STATUS_TRANSITIONS, OrderStatus
+from status_transitions import StatusTransitionConflict, transition_status
+
+
+async def change_status(collection, new_status, expected_status=None):
+    return await transition_status(
+        collection,
+        {"_id": 1},
+        new_status,
+        user_id=100,
+        allowed_transitions=ADMIN_STATUS_TRANSITIONS,
+        expected_status=expected_status,
+    )
+
+
+def test_concurrent_changes_to_different_statuses_apply_once():
+    async def run():
+        collection = AsyncMongoMockClient()["test"]["requests"]
+        await collection.insert_one({"_id": 1, "status": OrderStatus.WAITING.value})
+
+        results = await asyncio.gather(
+            change_status(collection, OrderStatus.IN_PROGRESS, OrderStatus.WAITING),
+            change_status(collection, OrderStatus.REJECTED, OrderStatus.WAITING),
+            return_exceptions=True,
+        )
+
+        return results, await collection.find_one({"_id": 1})
+
+    (first, second), request = asyncio.run(run())
+
+    assert first["status"] == OrderStatus.IN_PROGRESS.value
+    assert first["previous_status"] == OrderStatus.WAITING.value
+    assert isinstance(second, StatusTransitionConflict)
+    assert second.current_status == OrderStatus.IN_PROGRESS
+    assert request["status"] == OrderStatus.IN_PROGRESS.value
+
+
+def test_change_without_expected_status_allows_any_admin_transition():
+    async def run():
+        collection = AsyncMongoMockClient()["test"]["requests"]
+        await collection.insert_one({"_id": 1, "status": OrderStatus.IN_PROGRESS.value})
+
+        return await change_status(collection, OrderStatus.COMPLETED)
+
+    request = asyncio.run(run())
+
+    assert request["status"] == OrderStatus.COMPLETED.value
+    assert request["previous_status"] == OrderStatus.IN_PROGRESS.value
+
+
+def test_missing_request_conflicts_without_status():
+    async def run():
+        collection = AsyncMongoMockClient()["test"]["requests"]
+        await change_status(collection, OrderStatus.COMPLETED, OrderStatus.WAITING)
+
+    with pytest.raises(StatusTransitionConflict) as e:
+        asyncio.run(run())
+
+    assert e.value.current_status is None
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import WEBHOOK_DRAIN_TIMEOUT, WEBHOOK_QUEUE_SIZE, WEBHOOK_WORKERS
+
+
+def get_update_chat_id(raw_update: Dict[str, Any]) -> int:
+    """
+    Returns the chat the update belongs to without parsing it into an Update model.
+    """
+    for field in ("message", "edited_message", "channel_post"):
+        message = raw_update.get(field)
+        if message:
+            return message.get("chat", {}).get("id", 0)
+
+    callback_query = raw_update.get("callback_query")
+    if callback_query:
+        message = callback_query.get("message") or {}
+        chat_id = message.get("chat", {}).get("id")
+        if chat_id is not None:
+            return chat_id
+
+        return callback_query.get("from", {}).get("id", 0)
+
+    return raw_update.get("update_id", 0)
+
+
+class UpdateWorkerPool:
+    """
+    Processes webhook updates in the background so the endpoint can answer Telegram at once.
+    Every worker owns a bounded queue and updates are sharded by chat id,
+    so updates of one chat are always handled in the order they arrived.
+    """
+
+    def __init__(
+        self,
+        workers: int = WEBHOOK_WORKERS,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+        drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT,
+    ) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.drain_timeout = drain_timeout
+
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._is_accepting = False
+
+    def start(self, bot: Bot, dp: Dispatcher) -> None:
+        if self._tasks:
+            return
+
+        self._queues = [
+            asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)
+        ]
+        self._tasks = [
+            asyncio.create_task(self._run(queue, bot, dp)) for queue in self._queues
+        ]
+        self._is_accepting = True
+
+    async def stop(self) -> None:
+        """
+        Stops accepting updates and waits up to drain_timeout for the queued ones.
+        """
+        self._is_accepting = False
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)),
+                timeout=self.drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"Dropping {self.queued} updates that were not processed in time")
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+
+    def submit(self, raw_update: Dict[str, Any]) -> bool:
+        """
+        Queues the update. Returns False if the pool is stopped or the chat's queue is full.
+        """
+        if not self._is_accepting:
+            self.rejected += 1
+            return False
+
+        queue = self._queues[get_update_chat_id(raw_update) % len(self._queues)]
+
+        try:
+            queue.put_nowait(raw_update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self.accepted += 1
+        return True
+
+    @property
+    def queued(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self.queued,
+            "longest_queue": max((queue.qsize() for queue in self._queues), default=0),
+            "in_flight": self.in_flight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _run(self, queue: asyncio.Queue, bot: Bot, dp: Dispatcher) -> None:
+        while True:
+            raw_update = await queue.get()
+            self.in_flight += 1
+
+            try:
+                update = Update.model_validate(raw_update, context={"bot": bot})
+                await dp.feed_update(bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(e)
+            finally:
+                self.in_flight -= 1
+                queue.task_done()
+
+
+update_worker_pool = UpdateWorkerPool()
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.collection import Collection
+
+from schemas.request import Request
+from utils.str_to_digits_id import srt_to_digits_id
+
+
+async def get_legacy_request_id(
+    collection: Collection[Request], user_id: int, digits_id: str
+) -> Optional[ObjectId]:
+    """
+    Finds the user's request shown as digits_id that has no digits_id stored,
+    i.e. one whose digits ID collided during the backfill, by hashing its _id.
+    """
+    cursor = collection.find(
+        {"user_id": user_id, "digits_id": {"$exists": False}}, {"_id": 1}
+    )
+    async for request in cursor:
+        if srt_to_digits_id(str(request["_id"])) == digits_id:
+            return request["_id"]
+
+    return None
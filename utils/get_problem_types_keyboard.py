@@ -0,0 +1,18 @@
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from constants.order_types import ORDER_TYPE_NAMES, OrderType
+
+
+def get_problem_types_keyboard() -> InlineKeyboardMarkup:
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text=ORDER_TYPE_NAMES[order_type],
+                callback_data=f"ptype:{order_type.name}",
+            )
+        ]
+        for order_type in OrderType
+    ]
+    buttons.append([InlineKeyboardButton(text="⬅ Назад", callback_data="back:dorm")])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -0,0 +1,52 @@
+from bisect import bisect_left
+from datetime import datetime
+from pymongo.collection import Collection
+
+from constants.order_statuses import OrderStatus
+from constants.order_types import OrderType
+
+OPEN_ORDER_STATUSES = [OrderStatus.WAITING.value, OrderStatus.IN_PROGRESS.value]
+
+
+async def get_queue_positions(
+    collection: Collection, orders: list[tuple[OrderType, datetime]]
+) -> list[int]:
+    """
+    Returns queue positions for many (problem_type, timestamp) pairs with one aggregation
+    that fetches the sorted timestamps of open requests of every requested type.
+    """
+    if not orders:
+        return []
+
+    max_timestamps: dict[OrderType, datetime] = {}
+    for problem_type, timestamp in orders:
+        current_max = max_timestamps.get(problem_type)
+        if current_max is None or timestamp > current_max:
+            max_timestamps[problem_type] = timestamp
+
+    pipeline = [
+        {
+            "$match": {
+                "$or": [
+                    {
+                        "problem_type": problem_type.value,
+                        "status": {"$in": OPEN_ORDER_STATUSES},
+                        "timestamp": {"$lt": timestamp},
+                    }
+                    for problem_type, timestamp in max_timestamps.items()
+                ]
+            }
+        },
+        {"$project": {"_id": 0, "problem_type": 1, "timestamp": 1}},
+        {"$sort": {"timestamp": 1}},
+        {"$group": {"_id": "$problem_type", "timestamps": {"$push": "$timestamp"}}},
+    ]
+
+    open_timestamps: dict[str, list[datetime]] = {}
+    async for doc in collection.aggregate(pipeline):
+        open_timestamps[doc["_id"]] = doc["timestamps"]
+
+    return [
+        bisect_left(open_timestamps.get(problem_type.value, []), timestamp) + 1
+        for problem_type, timestamp in orders
+    ]
@@ -0,0 +1,7 @@
+from schemas.request import Request
+from utils.str_to_digits_id import srt_to_digits_id
+
+
+def get_request_digits_id(request: Request) -> str:
+    # Requests that collided during the digits_id backfill don't have it stored
+    return request.get("digits_id") or srt_to_digits_id(str(request["_id"]))
@@ -1,8 +1,12 @@
+from functools import lru_cache
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from constants.order_statuses import ORDER_STATUS_NAMES, OrderStatus
 
 
+# Status changes come in bursts on the same few cards
+@lru_cache(maxsize=1024)
 def get_status_keyboard(
     current_status: OrderStatus, request_id: str
 ) -> InlineKeyboardMarkup:
@@ -15,7 +19,9 @@ def get_status_keyboard(
             [
                 InlineKeyboardButton(
                     text=ORDER_STATUS_NAMES[status],
-                    callback_data=f"status:{status.name}:{request_id}",
+                    callback_data=(
+                        f"status:{status.name}:{current_status.name}:{request_id}"
+                    ),
                 ),
             ]
         )
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from bson import ObjectId
+from pymongo.collection import Collection
+
+from schemas.request import Request
+from utils.get_queue_positions import OPEN_ORDER_STATUSES
+
+# Open requests are listed before closed ones, newest first in both segments
+OPEN_SEGMENT = 0
+CLOSED_SEGMENT = 1
+SEGMENT_STATUSES = {
+    OPEN_SEGMENT: {"$in": OPEN_ORDER_STATUSES},
+    CLOSED_SEGMENT: {"$nin": OPEN_ORDER_STATUSES},
+}
+
+MAX_DETAILS_LENGTH = 100
+
+REQUEST_PAGE_PROJECTION = {
+    "digits_id": 1,
+    "problem_type": 1,
+    "dorm": 1,
+    "status": 1,
+    "timestamp": 1,
+    "details": {
+        "$substrCP": [{"$ifNull": ["$details", ""]}, 0, MAX_DETAILS_LENGTH + 1]
+    },
+}
+
+PageCursor = tuple[int, datetime, ObjectId]
+
+
+def get_keyset_filter(
+    user_id: int, segment: int, after: Optional[PageCursor], is_forward: bool
+) -> dict[str, Any]:
+    query: dict[str, Any] = {"user_id": user_id, "status": SEGMENT_STATUSES[segment]}
+
+    if after is not None:
+        _, timestamp, request_id = after
+        operator = "$lt" if is_forward else "$gt"
+        query["$or"] = [
+            {"timestamp": {operator: timestamp}},
+            {"timestamp": timestamp, "_id": {operator: request_id}},
+        ]
+
+    return query
+
+
+async def get_user_requests_page(
+    collection: Collection[Request],
+    user_id: int,
+    after: Optional[PageCursor] = None,
+    is_forward: bool = True,
+    limit: int = 5,
+) -> tuple[list[tuple[int, Request]], bool]:
+    """
+    Returns up to limit (segment, request) pairs after the cursor in the given direction
+    and whether there are more requests in that direction.
+    Pages are fetched by keyset on (timestamp, _id), so a page costs the same
+    no matter how deep in the history it is.
+    """
+    if after is None:
+        segments = [OPEN_SEGMENT, CLOSED_SEGMENT]
+    elif is_forward:
+        segments = list(range(after[0], CLOSED_SEGMENT + 1))
+    else:
+        segments = list(range(after[0], OPEN_SEGMENT - 1, -1))
+
+    direction = -1 if is_forward else 1
+    requests: list[tuple[int, Request]] = []
+
+    for segment in segments:
+        segment_after = after if after is not None and segment == after[0] else None
+
+        cursor = (
+            collection.find(
+                get_keyset_filter(user_id, segment, segment_after, is_forward),
+                REQUEST_PAGE_PROJECTION,
+            )
+            .sort([("timestamp", direction), ("_id", direction)])
+            .limit(limit + 1 - len(requests))
+        )
+        requests.extend([(segment, request) async for request in cursor])
+
+        if len(requests) > limit:
+            break
+
+    has_more = len(requests) > limit
+    requests = requests[:limit]
+
+    if not is_forward:
+        requests.reverse()
+
+    return requests, has_more
@@ -0,0 +1,37 @@
+from typing import Any
+
+
+def get_winning_plan_stages(explain: Any) -> set[str]:
+    """
+    Collects the stage names of every winning plan in an explain output.
+    Works for find, count and aggregate explains, including the ones
+    that nest the query planner output under pipeline stages.
+    """
+    stages: set[str] = set()
+
+    def collect_stages(node: Any) -> None:
+        if isinstance(node, dict):
+            stage = node.get("stage")
+            if isinstance(stage, str):
+                stages.add(stage)
+
+            for value in node.values():
+                collect_stages(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect_stages(value)
+
+    def find_winning_plans(node: Any) -> None:
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "winningPlan":
+                    collect_stages(value)
+                else:
+                    find_winning_plans(value)
+        elif isinstance(node, list):
+            for value in node:
+                find_winning_plans(value)
+
+    find_winning_plans(explain)
+
+    return stages
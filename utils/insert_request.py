@@ -0,0 +1,34 @@
+from bson import ObjectId
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from schemas.request import Request
+from utils.str_to_digits_id import srt_to_digits_id
+
+MAX_INSERT_ATTEMPTS = 5
+
+
+async def insert_request(collection: Collection, request: Request) -> Request:
+    """
+    Inserts the request with a unique digits ID and returns the stored request.
+    On a digits ID collision the request is retried with a new ObjectId.
+    If a request of the same form_id was already inserted (the form was submitted
+    again after a failure), that request is returned instead.
+    """
+    for _ in range(MAX_INSERT_ATTEMPTS):
+        request_id = ObjectId()
+        request["_id"] = request_id
+        request["digits_id"] = srt_to_digits_id(str(request_id))
+
+        try:
+            await collection.insert_one(request)
+            return request
+        except DuplicateKeyError as e:
+            if "form_id" not in (e.details or {}).get("keyPattern", {}):
+                continue
+
+        existing = await collection.find_one({"form_id": request["form_id"]})
+        if existing is not None:
+            return existing
+
+    raise RuntimeError("Could not generate a unique digits ID for the request")
@@ -0,0 +1,25 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class LRUSet:
+    """
+    Set that keeps only the maxsize most recently added keys.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._keys: OrderedDict[Hashable, None] = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable) -> None:
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from middlewares.handler_context import current_handler
+
+
+class PeriodicTask:
+    """
+    Runs func every interval seconds in a background task until stopped.
+    Errors are printed and don't stop the loop. The name is set as the current handler,
+    so the Mongo commands of the task are attributed to it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        interval: float,
+        run_at_start: bool = False,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_at_start = run_at_start
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+    async def _run(self) -> None:
+        current_handler.set(self.name)
+
+        if not self.run_at_start:
+            await asyncio.sleep(self.interval)
+
+        while True:
+            try:
+                await self.func()
+            except Exception as e:
+                print(e)
+
+            await asyncio.sleep(self.interval)
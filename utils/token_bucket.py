@@ -0,0 +1,69 @@
+import asyncio
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket. Waiters are served by priority (lower value first),
+    then in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated_at = monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def is_idle(self) -> bool:
+        self._refill()
+        return not self._waiters and self._tokens >= self.capacity
+
+    async def acquire(self, priority: int = 0) -> None:
+        self._refill()
+
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heappush(self._waiters, (priority, next(self._counter), future))
+        self._schedule_wakeup()
+
+        await future
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def _schedule_wakeup(self) -> None:
+        if self._wakeup is not None:
+            return
+
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._wakeup = None
+        self._refill()
+
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heappop(self._waiters)
+            if future.done():
+                continue
+
+            self._tokens -= 1
+            future.set_result(None)
+
+        if self._waiters:
+            self._schedule_wakeup()